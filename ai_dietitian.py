@@ -1,25 +1,65 @@
-import json
-from typing import List, Dict, Any, Optional
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Awaitable, Callable, Iterator, Tuple
 
-import google.generativeai as genai
-from google.generativeai import types
-
-from models import UserProfile, WeeklyDietPlan
+from models import DailyPlan, PlanSkeleton, UserProfile, WeeklyDietPlan
+from chat_memory import SUMMARY_INSTRUCTION, ChatMemory
 from config import Config
+from energy_targets import NutritionTargets, plan_calorie_deviation, targets_for_profile
+from llm_backends import LLMBackend, create_backend
+from nutrition_db import recompute_plan
+from plan_assembly import WEEK_DAYS, assemble_weekly_plan
+from plan_cache import PlanCache, canonical_key, normalize_profile
+from plan_templates import adapt_template, profile_bucket
+from profile_updates import PROFILE_UPDATE_ADAPTER, ProfileExtraction, merge_profile
+from response_schemas import (
+    DAILY_PLAN_SCHEMA,
+    PLAN_SKELETON_SCHEMA,
+    PROFILE_UPDATE_SCHEMA,
+    USER_PROFILE_SCHEMA,
+    WEEKLY_PLAN_SCHEMA,
+)
+from singleflight import AsyncSingleFlight, SingleFlight
+
+logger = logging.getLogger(__name__)
 
 
 class AIDietitian:
-    """AI Dietitian service using Gemini 2.5 Flash"""
+    """AI Dietitian service using Gemini 2.5 Flash or any other LLMBackend"""
 
-    def __init__(self):
-        Config.validate()
-        # Configure Gemini API with the API key
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        self.model_name = Config.GEMINI_MODEL
+    def __init__(
+        self,
+        backend: Optional[LLMBackend] = None,
+        plan_cache: Optional[PlanCache] = None,
+        chat_memory: Optional[ChatMemory] = None,
+        max_concurrency: Optional[int] = None,
+        request_timeout: Optional[float] = None,
+        use_plan_cache: bool = True,
+    ):
+        self.backend = backend if backend is not None else create_backend()
+        self.model_name = self.backend.model_name
 
         self.system_prompt = self._get_system_prompt()
         self.few_shot_examples = self._get_few_shot_examples()
         self.cot_prompts = self._get_cot_prompts()
+        # use_plan_cache=False always generates, whatever PLAN_CACHE_ENABLED says
+        if not use_plan_cache:
+            self.plan_cache = None
+        else:
+            self.plan_cache = plan_cache if plan_cache is not None else PlanCache.from_config()
+        self.chat_memory = chat_memory if chat_memory is not None else ChatMemory.from_config()
+
+        # Limits for the async API
+        self.max_concurrency = max_concurrency or Config.LLM_MAX_CONCURRENCY
+        # Bounds the whole call, retries included, so it defaults to the retry deadline
+        self.request_timeout = request_timeout or Config.LLM_CALL_DEADLINE_SECONDS
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Identical concurrent plan requests share one upstream generation
+        self._flights = SingleFlight()
+        self._aflights = AsyncSingleFlight()
 
     def _get_system_prompt(self) -> str:
         return (
@@ -46,21 +86,31 @@ class AIDietitian:
             "meal_planning": "Think step by step to build a realistic weekly Indian-friendly meal plan.",
         }
 
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Semaphore limiting concurrent upstream calls on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _run_upstream(self, coro: Awaitable[str], timeout: Optional[float]) -> str:
+        if timeout is None:
+            timeout = self.request_timeout
+        async with self._get_semaphore():
+            return await asyncio.wait_for(coro, timeout=timeout)
+
     # ------------ basic chat ------------
 
-    def chat(self, message: str, conversation_history: List[Dict[str, str]]) -> str:
-        """Chat with Gemini model."""
-        model = genai.GenerativeModel(self.model_name, system_instruction=self.system_prompt)
-        
-        # Build message history with few-shot examples
+    def _few_shot_messages(self) -> List[Dict[str, str]]:
         messages = []
-        
-        # Add few-shot examples
         for ex in self.few_shot_examples:
             messages.append({"role": "user", "parts": ex["user"]})
             messages.append({"role": "model", "parts": ex["assistant"]})
-        
-        # Add conversation history
+        return messages
+
+    def _history_messages(self, conversation_history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        messages = []
         for turn in conversation_history:
             if "role" in turn and "content" in turn:
                 # Handle Streamlit format: {"role": "user"/"assistant", "content": "..."}
@@ -70,49 +120,102 @@ class AIDietitian:
                 messages.append({"role": "user", "parts": turn["user"]})
             if "assistant" in turn and "role" not in turn:
                 messages.append({"role": "model", "parts": turn["assistant"]})
-        
-        # Add current message
+        return messages
+
+    def _build_chat_messages(
+        self, message: str, conversation_history: List[Dict[str, str]]
+    ) -> List[Dict[str, str]]:
+        # Few-shot examples, the whole conversation history, then the current message
+        messages = self._few_shot_messages()
+        messages.extend(self._history_messages(conversation_history))
         messages.append({"role": "user", "parts": message})
-        
-        # Generate response
-        response = model.generate_content(messages)
-        return response.text
+        return messages
 
-    # ------------ user profile extraction ------------
+    def _summarize_chunk(self, previous: Optional[str], chunk: List[Dict[str, str]]) -> str:
+        request = self.chat_memory.summary_request(previous, chunk)
+        return self.backend.generate_chat(request, system_instruction=SUMMARY_INSTRUCTION).strip()
 
-    def extract_user_profile(
-        self, conversation_history: List[Dict[str, str]]
-    ) -> Optional[UserProfile]:
-        """Extract user profile from conversation using structured output."""
-        schema = {
-            "type": "object",
-            "properties": {
-                "name": {"type": "string"},
-                "age": {"type": "integer"},
-                "gender": {"type": "string"},
-                "height_cm": {"type": "number"},
-                "weight_kg": {"type": "number"},
-                "target_weight_kg": {"type": "number"},
-                "activity_level": {"type": "string"},
-                "goal": {"type": "string"},
-                "dietary_restrictions": {"type": "array", "items": {"type": "string"}},
-                "allergies": {"type": "array", "items": {"type": "string"}},
-                "preferences": {"type": "array", "items": {"type": "string"}},
-                "dislikes": {"type": "array", "items": {"type": "string"}},
-                "daily_routine": {
-                    "type": "object",
-                    "properties": {
-                        "wake_time": {"type": "string"},
-                        "sleep_time": {"type": "string"}
-                    }
-                },
-                "cooking_skill": {"type": "string"},
-                "budget_constraint": {"type": "string"},
-                "cultural_preferences": {"type": "array", "items": {"type": "string"}},
-            },
-            "required": ["name", "age", "gender", "height_cm", "weight_kg"],
-        }
+    def _chat_messages(
+        self, message: str, conversation_history: List[Dict[str, str]]
+    ) -> List[Dict[str, str]]:
+        """Request messages within the chat memory's budget (whole history without one)"""
+        if self.chat_memory is None:
+            return self._build_chat_messages(message, conversation_history)
+        history = self._history_messages(conversation_history)
+        boundary = self.chat_memory.boundary(len(history))
+        summary, covered, pending = self.chat_memory.summary_plan(self.model_name, history, boundary)
+        for key, chunk in pending:
+            try:
+                summary = self._summarize_chunk(summary, chunk)
+            except Exception as e:
+                # Carry on with the notes so far; messages they don't cover are sent
+                # verbatim (within the budget) rather than failing the reply
+                print(f"Chat summary error: {e}")
+                break
+            self.chat_memory.store(key, summary)
+            covered += len(chunk)
+        return self.chat_memory.assemble(
+            self._few_shot_messages(), summary, history[covered:], message
+        )
 
+    async def _achat_messages(
+        self,
+        message: str,
+        conversation_history: List[Dict[str, str]],
+        timeout: Optional[float],
+    ) -> List[Dict[str, str]]:
+        """Async variant of _chat_messages; summary calls share the concurrency semaphore"""
+        if self.chat_memory is None:
+            return self._build_chat_messages(message, conversation_history)
+        history = self._history_messages(conversation_history)
+        boundary = self.chat_memory.boundary(len(history))
+        summary, covered, pending = self.chat_memory.summary_plan(self.model_name, history, boundary)
+        for key, chunk in pending:
+            request = self.chat_memory.summary_request(summary, chunk)
+            try:
+                summary = (
+                    await self._run_upstream(
+                        self.backend.agenerate_chat(request, system_instruction=SUMMARY_INSTRUCTION),
+                        timeout,
+                    )
+                ).strip()
+            except Exception as e:
+                print(f"Chat summary error: {e}")
+                break
+            self.chat_memory.store(key, summary)
+            covered += len(chunk)
+        return self.chat_memory.assemble(
+            self._few_shot_messages(), summary, history[covered:], message
+        )
+
+    def chat(self, message: str, conversation_history: List[Dict[str, str]]) -> str:
+        """Chat with Gemini model."""
+        messages = self._chat_messages(message, conversation_history)
+        return self.backend.generate_chat(messages, system_instruction=self.system_prompt)
+
+    def chat_stream(
+        self, message: str, conversation_history: List[Dict[str, str]]
+    ) -> Iterator[str]:
+        """Chat with Gemini model, yielding the reply in chunks as they arrive."""
+        messages = self._chat_messages(message, conversation_history)
+        return self.backend.stream_chat(messages, system_instruction=self.system_prompt)
+
+    async def achat(
+        self,
+        message: str,
+        conversation_history: List[Dict[str, str]],
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Async variant of chat, bounded by the concurrency semaphore."""
+        messages = await self._achat_messages(message, conversation_history, timeout)
+        return await self._run_upstream(
+            self.backend.agenerate_chat(messages, system_instruction=self.system_prompt),
+            timeout,
+        )
+
+    # ------------ user profile extraction ------------
+
+    def _format_turns(self, conversation_history: List[Dict[str, str]]) -> str:
         # Convert conversation history to readable format
         formatted_history = ""
         for turn in conversation_history:
@@ -122,54 +225,524 @@ class AIDietitian:
             elif "user" in turn and "assistant" in turn:
                 formatted_history += f"USER: {turn['user']}\n"
                 formatted_history += f"ASSISTANT: {turn['assistant']}\n"
+        return formatted_history
 
-        prompt = (
+    def _build_profile_prompt(self, conversation_history: List[Dict[str, str]]) -> str:
+        return (
             f"{self.cot_prompts['profile_extraction']}\n"
             "Conversation history:\n"
-            f"{formatted_history}\n\n"
+            f"{self._format_turns(conversation_history)}\n\n"
             "Extract user profile as JSON with the schema provided."
         )
 
-        model = genai.GenerativeModel(self.model_name)
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.GenerationConfig(
-                response_mime_type="application/json",
-                response_schema=schema,
-            ),
+    def _build_profile_update_prompt(
+        self, profile: UserProfile, new_turns: List[Dict[str, str]]
+    ) -> str:
+        return (
+            f"{self.cot_prompts['profile_extraction']}\n"
+            "Current user profile:\n"
+            f"{profile.model_dump_json(indent=2)}\n\n"
+            "New conversation turns:\n"
+            f"{self._format_turns(new_turns)}\n\n"
+            "Return only the fields these turns add or change, as JSON with the schema "
+            "provided, and leave every other field null. For a list field that changes, "
+            "return the complete updated list."
         )
 
+    def _parse_profile(self, response_text: str) -> Optional[UserProfile]:
         try:
-            # Parse the JSON response
-            data = json.loads(response.text)
-            return UserProfile(**data)
+            return UserProfile.model_validate_json(response_text)
         except Exception as e:
             print(f"Profile extraction error: {e}")
             return None
 
+    def extract_user_profile(
+        self, conversation_history: List[Dict[str, str]]
+    ) -> Optional[UserProfile]:
+        """Extract user profile from conversation using structured output."""
+        prompt = self._build_profile_prompt(conversation_history)
+        return self._generate_with_retries(
+            "Profile extraction",
+            prompt,
+            USER_PROFILE_SCHEMA,
+            self._parse_profile,
+            1 + Config.LLM_INVALID_JSON_RETRIES,
+        )
+
+    def _parse_profile_update(
+        self, response_text: str, profile: UserProfile
+    ) -> Optional[UserProfile]:
+        try:
+            return merge_profile(profile, PROFILE_UPDATE_ADAPTER.validate_json(response_text))
+        except Exception as e:
+            print(f"Profile update error: {e}")
+            return None
+
+    def _update_request(
+        self, conversation_history: List[Dict[str, str]], previous: Optional[ProfileExtraction]
+    ) -> Optional[Tuple[str, Callable[[str], Optional[UserProfile]]]]:
+        """(prompt, parse) for the turns after previous, or None when a full extraction is needed"""
+        if previous is None or previous.profile is None:
+            return None
+        if previous.processed_turns > len(conversation_history):
+            # Not the conversation previous came from
+            return None
+        prompt = self._build_profile_update_prompt(
+            previous.profile, conversation_history[previous.processed_turns:]
+        )
+        return prompt, lambda text: self._parse_profile_update(text, previous.profile)
+
+    def extract_user_profile_incremental(
+        self,
+        conversation_history: List[Dict[str, str]],
+        previous: Optional[ProfileExtraction] = None,
+    ) -> ProfileExtraction:
+        """Extract only what the turns since previous add, merged into previous.profile.
+
+        Pass the returned ProfileExtraction back in on the next call. Without a
+        previous profile the whole conversation is extracted; when an update
+        fails, previous is returned so its turns are retried next time.
+        """
+        turn_count = len(conversation_history)
+        if previous and previous.profile is not None and previous.processed_turns == turn_count:
+            return previous
+        request = self._update_request(conversation_history, previous)
+        if request is None:
+            profile = self.extract_user_profile(conversation_history)
+            return ProfileExtraction(profile, turn_count if profile is not None else 0)
+
+        prompt, parse = request
+        profile = self._generate_with_retries(
+            "Profile update",
+            prompt,
+            PROFILE_UPDATE_SCHEMA,
+            parse,
+            1 + Config.LLM_INVALID_JSON_RETRIES,
+        )
+        return previous if profile is None else ProfileExtraction(profile, turn_count)
+
+    async def aextract_user_profile(
+        self, conversation_history: List[Dict[str, str]], timeout: Optional[float] = None
+    ) -> Optional[UserProfile]:
+        """Async variant of extract_user_profile."""
+        prompt = self._build_profile_prompt(conversation_history)
+        return await self._agenerate_with_retries(
+            "Profile extraction",
+            prompt,
+            USER_PROFILE_SCHEMA,
+            self._parse_profile,
+            1 + Config.LLM_INVALID_JSON_RETRIES,
+            timeout,
+        )
+
+    async def aextract_user_profile_incremental(
+        self,
+        conversation_history: List[Dict[str, str]],
+        previous: Optional[ProfileExtraction] = None,
+        timeout: Optional[float] = None,
+    ) -> ProfileExtraction:
+        """Async variant of extract_user_profile_incremental."""
+        turn_count = len(conversation_history)
+        if previous and previous.profile is not None and previous.processed_turns == turn_count:
+            return previous
+        request = self._update_request(conversation_history, previous)
+        if request is None:
+            profile = await self.aextract_user_profile(conversation_history, timeout)
+            return ProfileExtraction(profile, turn_count if profile is not None else 0)
+
+        prompt, parse = request
+        profile = await self._agenerate_with_retries(
+            "Profile update",
+            prompt,
+            PROFILE_UPDATE_SCHEMA,
+            parse,
+            1 + Config.LLM_INVALID_JSON_RETRIES,
+            timeout,
+        )
+        return previous if profile is None else ProfileExtraction(profile, turn_count)
+
     # ------------ weekly diet plan creation ------------
 
-    def create_diet_plan(self, user_profile: UserProfile) -> Optional[WeeklyDietPlan]:
-        prompt = (
+    def _plan_cache_key(self, user_profile: UserProfile) -> str:
+        return canonical_key(
+            self.model_name,
+            self.cot_prompts["meal_planning"],
+            # Plans generated with and without computed targets differ
+            Config.BMR_FORMULA if Config.ENERGY_TARGETS_IN_PROMPT else None,
+            normalize_profile(user_profile),
+        )
+
+    def _cached_plan(
+        self, user_profile: UserProfile
+    ) -> Tuple[Optional[str], Optional[WeeklyDietPlan]]:
+        if self.plan_cache is None:
+            return None, None
+        cache_key = self._plan_cache_key(user_profile)
+        cached = self.plan_cache.get(cache_key)
+        if cached is not None:
+            # Identical up to normalisation; keep the caller's exact profile
+            cached = cached.model_copy(update={"user_profile": user_profile})
+        elif Config.PLAN_TEMPLATES_ENABLED:
+            cached = self._template_plan(cache_key, user_profile)
+        return cache_key, cached
+
+    def _template_key(self, user_profile: UserProfile) -> str:
+        return canonical_key(
+            "template",
+            self.model_name,
+            self.cot_prompts["meal_planning"],
+            Config.BMR_FORMULA if Config.ENERGY_TARGETS_IN_PROMPT else None,
+            profile_bucket(user_profile),
+        )
+
+    def _template_plan(self, cache_key: str, user_profile: UserProfile) -> Optional[WeeklyDietPlan]:
+        """A near-identical profile's plan scaled to this user, or None on a bucket miss"""
+        template = self.plan_cache.get(self._template_key(user_profile), template=True)
+        if template is None:
+            return None
+        plan = adapt_template(template, user_profile)
+        if plan is None:
+            return None
+        if Config.RECOMPUTE_NUTRITION:
+            plan = recompute_plan(plan)
+        self.plan_cache.put(cache_key, plan)
+        return plan
+
+    def _single_flight(
+        self, mode: str, user_profile: UserProfile, create: Callable[[], Optional[WeeklyDietPlan]]
+    ) -> Optional[WeeklyDietPlan]:
+        # mode must name every option create depends on: followers get the leader's result
+        plan, shared = self._flights.do(f"{mode}:{self._plan_cache_key(user_profile)}", create)
+        return self._for_caller(plan, shared, user_profile)
+
+    async def _asingle_flight(
+        self,
+        mode: str,
+        user_profile: UserProfile,
+        create: Callable[[], Awaitable[Optional[WeeklyDietPlan]]],
+        timeout: Optional[float],
+    ) -> Optional[WeeklyDietPlan]:
+        """Like _single_flight; timeout bounds this caller's wait, not the shared generation"""
+        plan, shared = await self._aflights.do(
+            f"{mode}:{self._plan_cache_key(user_profile)}", create, timeout
+        )
+        return self._for_caller(plan, shared, user_profile)
+
+    def _for_caller(
+        self, plan: Optional[WeeklyDietPlan], shared: bool, user_profile: UserProfile
+    ) -> Optional[WeeklyDietPlan]:
+        if shared and plan is not None:
+            # Same canonical profile, but give each caller back their own
+            plan = plan.model_copy(update={"user_profile": user_profile})
+        return plan
+
+    def _energy_targets(self, user_profile: UserProfile) -> Optional[NutritionTargets]:
+        if not Config.ENERGY_TARGETS_IN_PROMPT:
+            return None
+        return targets_for_profile(user_profile, Config.BMR_FORMULA)
+
+    def _targets_prompt(self, user_profile: UserProfile) -> str:
+        """Computed energy targets, so the model doesn't have to estimate them"""
+        targets = self._energy_targets(user_profile)
+        if targets is None:
+            return ""
+        return (
+            f"Daily targets (already calculated: BMR {targets.bmr} kcal, "
+            f"TDEE {targets.tdee} kcal): {targets.calories} kcal, {targets.protein_g} g protein, "
+            f"{targets.carbs_g} g carbs, {targets.fat_g} g fat. "
+            "Use these targets; do not recalculate them. Keep every day within 5% of the "
+            "calorie target.\n\n"
+        )
+
+    def _build_plan_prompt(self, user_profile: UserProfile) -> str:
+        return (
             f"{self.cot_prompts['meal_planning']}\n\n"
             "User profile:\n"
             f"{user_profile.model_dump_json(indent=2)}\n\n"
+            f"{self._targets_prompt(user_profile)}"
             "Create a realistic, budget-aware weekly diet plan with Indian options when possible. "
             "Use the JSON schema exactly."
         )
 
-        model = genai.GenerativeModel(self.model_name)
-        resp = model.generate_content(
-            prompt,
-            generation_config=genai.GenerationConfig(
-                response_mime_type="application/json",
-                response_schema=WeeklyDietPlan,
-            ),
+    def _validate_plan(self, resp_text: str) -> Optional[WeeklyDietPlan]:
+        try:
+            return WeeklyDietPlan.model_validate_json(resp_text)
+        except Exception as e:
+            print("Plan parse error:", e)
+            return None
+
+    def _parse_plan(
+        self, resp_text: str, cache_key: Optional[str], user_profile: UserProfile
+    ) -> Optional[WeeklyDietPlan]:
+        plan = self._validate_plan(resp_text)
+        if plan is None:
+            return None
+        return self._finalize_plan(cache_key, plan, user_profile)
+
+    def _finalize_plan(
+        self, cache_key: Optional[str], plan: WeeklyDietPlan, user_profile: UserProfile
+    ) -> WeeklyDietPlan:
+        """Fix up the model's arithmetic locally, then cache the plan (and its bucket template)"""
+        if Config.RECOMPUTE_NUTRITION:
+            plan = recompute_plan(plan)
+        targets = self._energy_targets(plan.user_profile)
+        if targets is not None:
+            deviation = plan_calorie_deviation(plan, targets)
+            if abs(deviation) > Config.CALORIE_TARGET_TOLERANCE:
+                # Debug level: most model plans miss somewhat, and batch runs would drown in it
+                logger.debug(
+                    "Plan averages %+.0f%% calories against the %d kcal target",
+                    deviation * 100,
+                    targets.calories,
+                )
+        if self.plan_cache is not None and cache_key is not None:
+            self.plan_cache.put(cache_key, plan)
+            if Config.PLAN_TEMPLATES_ENABLED:
+                self.plan_cache.put(self._template_key(user_profile), plan)
+        return plan
+
+    def create_diet_plan(self, user_profile: UserProfile) -> Optional[WeeklyDietPlan]:
+        """Create a weekly plan; concurrent calls for the same profile share one request"""
+        return self._single_flight(
+            "plan", user_profile, lambda: self._create_diet_plan(user_profile)
         )
 
+    async def acreate_diet_plan(
+        self, user_profile: UserProfile, timeout: Optional[float] = None
+    ) -> Optional[WeeklyDietPlan]:
+        """Async variant of create_diet_plan.
+
+        timeout bounds the wait for the whole plan. The generation itself runs
+        with request_timeout per upstream call, so a caller giving up early
+        doesn't fail others waiting on the same plan.
+        """
+        return await self._asingle_flight(
+            "plan", user_profile, lambda: self._acreate_diet_plan(user_profile), timeout
+        )
+
+    def _create_diet_plan(self, user_profile: UserProfile) -> Optional[WeeklyDietPlan]:
+        cache_key, cached = self._cached_plan(user_profile)
+        if cached is not None:
+            return cached
+
+        return self._generate_with_retries(
+            "Diet plan",
+            self._build_plan_prompt(user_profile),
+            WEEKLY_PLAN_SCHEMA,
+            lambda text: self._parse_plan(text, cache_key, user_profile),
+            1 + Config.LLM_INVALID_JSON_RETRIES,
+        )
+
+    async def _acreate_diet_plan(self, user_profile: UserProfile) -> Optional[WeeklyDietPlan]:
+        # SQLite lookups/commits, template scaling and recomputing nutrition block,
+        # so they run in worker threads rather than stalling every in-flight request
+        cache_key, cached = await asyncio.to_thread(self._cached_plan, user_profile)
+        if cached is not None:
+            return cached
+
+        plan = await self._agenerate_with_retries(
+            "Diet plan",
+            self._build_plan_prompt(user_profile),
+            WEEKLY_PLAN_SCHEMA,
+            self._validate_plan,
+            1 + Config.LLM_INVALID_JSON_RETRIES,
+            None,
+        )
+        if plan is None:
+            return None
+        return await asyncio.to_thread(self._finalize_plan, cache_key, plan, user_profile)
+
+    # ------------ per-day parallel plan creation ------------
+
+    def _build_skeleton_prompt(self, user_profile: UserProfile) -> str:
+        return (
+            f"{self.cot_prompts['meal_planning']}\n\n"
+            "User profile:\n"
+            f"{user_profile.model_dump_json(indent=2)}\n\n"
+            f"{self._targets_prompt(user_profile)}"
+            "Do not write the meals yet. Decide the daily calorie and protein targets, "
+            "one short theme per day (Monday to Sunday) for variety, and the weekly "
+            "recommendations. Use the JSON schema exactly."
+        )
+
+    def _build_day_prompt(
+        self, user_profile: UserProfile, skeleton: PlanSkeleton, day: str, theme: str
+    ) -> str:
+        return (
+            f"{self.cot_prompts['meal_planning']}\n\n"
+            "User profile:\n"
+            f"{user_profile.model_dump_json(indent=2)}\n\n"
+            f"Create the meals for {day} only (theme: {theme}). "
+            f"Target about {skeleton.daily_calorie_target} kcal and "
+            f"{skeleton.daily_protein_target_g} g protein for the day, with Indian options "
+            "when possible. Totals must equal the sum of the meals. Use the JSON schema exactly."
+        )
+
+    def _parse_skeleton(self, response_text: str) -> Optional[PlanSkeleton]:
         try:
-            data = json.loads(resp.text)
-            return WeeklyDietPlan(**data)
+            return PlanSkeleton.model_validate_json(response_text)
         except Exception as e:
-            print("Plan parse error:", e)
+            print(f"Plan skeleton parse error: {e}")
+            return None
+
+    def _parse_day(self, response_text: str, day: str) -> Optional[DailyPlan]:
+        try:
+            # The day name is ours, whatever the model wrote there
+            return DailyPlan.model_validate_json(response_text).model_copy(update={"day": day})
+        except Exception as e:
+            print(f"{day} plan parse error: {e}")
             return None
+
+    def _day_requests(
+        self, user_profile: UserProfile, skeleton: PlanSkeleton
+    ) -> List[Tuple[str, str]]:
+        targets = self._energy_targets(user_profile)
+        if targets is not None:
+            # The computed targets win over whatever the skeleton settled on
+            skeleton = skeleton.model_copy(
+                update={
+                    "daily_calorie_target": targets.calories,
+                    "daily_protein_target_g": targets.protein_g,
+                }
+            )
+        requests = []
+        for index, day in enumerate(WEEK_DAYS):
+            themes = skeleton.day_themes
+            theme = themes[index] if index < len(themes) else "balanced home cooking"
+            requests.append((day, self._build_day_prompt(user_profile, skeleton, day, theme)))
+        return requests
+
+    def _generate_with_retries(
+        self, label: str, prompt: str, schema: Any, parse: Callable[[str], Any], max_attempts: int
+    ) -> Any:
+        """Call the model until parse accepts its output, at most max_attempts times.
+
+        Only invalid output is retried here; upstream errors propagate (the
+        backend retries transient ones itself).
+        """
+        for attempt in range(1, max_attempts + 1):
+            result = parse(self.backend.generate_json(prompt, schema))
+            if result is not None:
+                return result
+            print(f"{label}: invalid model output (attempt {attempt} of {max_attempts})")
+        return None
+
+    async def _agenerate_with_retries(
+        self,
+        label: str,
+        prompt: str,
+        schema: Any,
+        parse: Callable[[str], Any],
+        max_attempts: int,
+        timeout: Optional[float],
+    ) -> Any:
+        for attempt in range(1, max_attempts + 1):
+            response_text = await self._run_upstream(
+                self.backend.agenerate_json(prompt, schema), timeout
+            )
+            result = parse(response_text)
+            if result is not None:
+                return result
+            print(f"{label}: invalid model output (attempt {attempt} of {max_attempts})")
+        return None
+
+    def _assemble_days(
+        self,
+        cache_key: Optional[str],
+        user_profile: UserProfile,
+        skeleton: PlanSkeleton,
+        daily_plans: List[Optional[DailyPlan]],
+    ) -> Optional[WeeklyDietPlan]:
+        if any(daily_plan is None for daily_plan in daily_plans):
+            print("Per-day plan generation failed after retries")
+            return None
+        plan = assemble_weekly_plan(user_profile, daily_plans, skeleton.recommendations)
+        return self._finalize_plan(cache_key, plan, user_profile)
+
+    def create_diet_plan_per_day(
+        self, user_profile: UserProfile, max_day_attempts: Optional[int] = None
+    ) -> Optional[WeeklyDietPlan]:
+        """Generate a skeleton, then all seven days concurrently, and merge locally.
+
+        A day whose output fails to validate is retried on its own; transient upstream
+        errors are retried by the backend. Concurrent calls for the same profile
+        share one generation.
+        """
+        attempts = max_day_attempts or Config.PER_DAY_MAX_ATTEMPTS
+        return self._single_flight(
+            f"per_day:{attempts}",
+            user_profile,
+            lambda: self._create_diet_plan_per_day(user_profile, attempts),
+        )
+
+    async def acreate_diet_plan_per_day(
+        self,
+        user_profile: UserProfile,
+        max_day_attempts: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Optional[WeeklyDietPlan]:
+        """Async variant of create_diet_plan_per_day; timeout works as in acreate_diet_plan."""
+        attempts = max_day_attempts or Config.PER_DAY_MAX_ATTEMPTS
+        return await self._asingle_flight(
+            f"per_day:{attempts}",
+            user_profile,
+            lambda: self._acreate_diet_plan_per_day(user_profile, attempts),
+            timeout,
+        )
+
+    def _create_diet_plan_per_day(
+        self, user_profile: UserProfile, attempts: int
+    ) -> Optional[WeeklyDietPlan]:
+        cache_key, cached = self._cached_plan(user_profile)
+        if cached is not None:
+            return cached
+
+        skeleton = self._generate_with_retries(
+            "Plan skeleton",
+            self._build_skeleton_prompt(user_profile),
+            PLAN_SKELETON_SCHEMA,
+            self._parse_skeleton,
+            attempts,
+        )
+        if skeleton is None:
+            return None
+
+        def generate_day(request: Tuple[str, str]) -> Optional[DailyPlan]:
+            day, prompt = request
+            parse = lambda text: self._parse_day(text, day)
+            return self._generate_with_retries(day, prompt, DAILY_PLAN_SCHEMA, parse, attempts)
+
+        requests = self._day_requests(user_profile, skeleton)
+        with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+            daily_plans = list(pool.map(generate_day, requests))
+        return self._assemble_days(cache_key, user_profile, skeleton, daily_plans)
+
+    async def _acreate_diet_plan_per_day(
+        self, user_profile: UserProfile, attempts: int
+    ) -> Optional[WeeklyDietPlan]:
+        # Blocking cache and finalize work runs in worker threads, as in _acreate_diet_plan
+        cache_key, cached = await asyncio.to_thread(self._cached_plan, user_profile)
+        if cached is not None:
+            return cached
+
+        skeleton = await self._agenerate_with_retries(
+            "Plan skeleton",
+            self._build_skeleton_prompt(user_profile),
+            PLAN_SKELETON_SCHEMA,
+            self._parse_skeleton,
+            attempts,
+            None,
+        )
+        if skeleton is None:
+            return None
+
+        def generate_day(day: str, prompt: str) -> Awaitable[Optional[DailyPlan]]:
+            parse = lambda text: self._parse_day(text, day)
+            return self._agenerate_with_retries(day, prompt, DAILY_PLAN_SCHEMA, parse, attempts, None)
+
+        daily_plans = await asyncio.gather(
+            *(generate_day(day, prompt) for day, prompt in self._day_requests(user_profile, skeleton))
+        )
+        return await asyncio.to_thread(
+            self._assemble_days, cache_key, user_profile, skeleton, list(daily_plans)
+        )
@@ -1,14 +1,18 @@
 import streamlit as st
-import os
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator, Optional
 import json
 
 from config import Config
-from ai_dietitian import AIDietitian
-from pdf_generator import DietPlanPDFGenerator
+from pdf_cache import PDFRenderCache, plan_pdf_key
+from pdf_service import PDFRenderService
+from resilience import CircuitOpenError
 from models import UserProfile, WeeklyDietPlan, ActivityLevel, Goal, DietaryRestriction, DailyRoutine
 
+# The LLM SDK and ReportLab are imported on first use so sessions start fast
+if TYPE_CHECKING:
+    from ai_dietitian import AIDietitian
+
 # Page configuration
 st.set_page_config(
     page_title="AI Diet Planner",
@@ -100,6 +104,49 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_ai_dietitian() -> "AIDietitian":
+    """Process-wide AIDietitian shared by all sessions and reruns"""
+    from ai_dietitian import AIDietitian
+
+    return AIDietitian()
+
+@st.cache_resource
+def get_pdf_service() -> PDFRenderService:
+    """Process pool shared by all sessions so PDF layout doesn't block the server"""
+    return PDFRenderService()
+
+@st.cache_resource
+def get_pdf_cache() -> PDFRenderCache:
+    """Rendered PDFs keyed on plan content, shared by all sessions"""
+    return PDFRenderCache.from_config()
+
+@st.cache_resource
+def get_pdf_fragment_cache() -> Optional[PDFRenderCache]:
+    """Per-section page fragments for in-process renders, shared by all sessions"""
+    return PDFRenderCache.fragments_from_config()
+
+def render_pdf(plan: WeeklyDietPlan) -> bytes:
+    """Render a plan to PDF bytes (cached), in the worker pool when enabled"""
+    pdf_cache = get_pdf_cache()
+    key = plan_pdf_key(plan)
+    pdf_bytes = pdf_cache.get(key)
+    if pdf_bytes is not None:
+        return pdf_bytes
+    if Config.PDF_RENDER_IN_WORKERS:
+        pdf_bytes = get_pdf_service().render(plan)
+    else:
+        from pdf_generator import DietPlanPDFGenerator
+
+        fragment_cache = get_pdf_fragment_cache()
+        if fragment_cache is not None:
+            # Only sections whose data changed (e.g. one regenerated day) are laid out again
+            pdf_bytes = DietPlanPDFGenerator().generate_diet_plan_pdf_incremental(plan, fragment_cache)
+        else:
+            pdf_bytes = DietPlanPDFGenerator().generate_diet_plan_pdf_bytes(plan)
+    pdf_cache.put(key, pdf_bytes)
+    return pdf_bytes
+
 def initialize_session_state():
     """Initialize session state variables"""
     if 'messages' not in st.session_state:
@@ -129,6 +176,45 @@ def display_chat_message(role: str, content: str):
         </div>
         """, unsafe_allow_html=True)
 
+def stream_chat_message(chunks: Iterator[str]) -> str:
+    """Render an assistant reply incrementally as chunks arrive and return the full text"""
+    placeholder = st.empty()
+    content = ""
+    for chunk in chunks:
+        content += chunk
+        placeholder.markdown(f"""
+        <div class="chat-message assistant-message">
+            <strong>Your AI nutritionist:</strong><br>{content}▌
+        </div>
+        """, unsafe_allow_html=True)
+    placeholder.empty()
+    display_chat_message("assistant", content)
+    return content
+
+def display_chat_section():
+    """Chat with the AI nutritionist, streaming replies as they are generated"""
+    st.subheader("💬 Ask Your AI nutritionist")
+    
+    for message in st.session_state.messages:
+        display_chat_message(message["role"], message["content"])
+    
+    prompt = st.chat_input("Ask about foods, swaps or your plan...")
+    if prompt:
+        display_chat_message("user", prompt)
+        try:
+            ai_dietitian = get_ai_dietitian()
+            reply = stream_chat_message(
+                ai_dietitian.chat_stream(prompt, st.session_state.messages)
+            )
+        except CircuitOpenError:
+            st.warning("⏳ The AI nutritionist is busy right now. Please try again in a minute.")
+            return
+        except Exception as e:
+            st.error(f"Error contacting AI nutritionist: {str(e)}")
+            return
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        st.session_state.messages.append({"role": "assistant", "content": reply})
+
 def display_user_profile(profile: UserProfile):
     """Display the extracted user profile"""
     st.subheader("📋 Your Profile Summary")
@@ -302,16 +388,21 @@ def main():
     # Generate Button
     if st.button("✨ Generate My Diet Plan", type="primary", use_container_width=True):
         try:
-            ai_dietitian = AIDietitian()
+            ai_dietitian = get_ai_dietitian()
             with st.spinner("Creating your personalized diet plan based on your profile..."):
                 # Use the profile directly from session state (populated by sidebar)
-                plan = ai_dietitian.create_diet_plan(st.session_state.user_profile)
+                if Config.PER_DAY_GENERATION:
+                    plan = ai_dietitian.create_diet_plan_per_day(st.session_state.user_profile)
+                else:
+                    plan = ai_dietitian.create_diet_plan(st.session_state.user_profile)
                 
                 if plan:
                     st.session_state.diet_plan = plan
                     st.success("✅ Diet plan generated successfully!")
                 else:
                     st.error("❌ Could not generate diet plan. Please try again.")
+        except CircuitOpenError:
+            st.warning("⏳ The AI service is busy right now. Please try again in a minute.")
         except Exception as e:
             st.error(f"Error generating plan: {str(e)}")
 
@@ -326,13 +417,8 @@ def main():
         
         if st.button("🔄 Generate PDF"):
             try:
-                pdf_generator = DietPlanPDFGenerator()
                 with st.spinner("Generating PDF..."):
-                    pdf_path = pdf_generator.generate_diet_plan_pdf(st.session_state.diet_plan)
-                    
-                    # Read the PDF file
-                    with open(pdf_path, "rb") as pdf_file:
-                        pdf_bytes = pdf_file.read()
+                    pdf_bytes = render_pdf(st.session_state.diet_plan)
                     
                     # Create download button
                     st.download_button(
@@ -342,12 +428,13 @@ def main():
                         mime="application/pdf"
                     )
                     
-                    # Clean up the temporary file
-                    os.remove(pdf_path)
-                    
             except Exception as e:
                 st.error(f"Error generating PDF: {str(e)}")
 
+    # Chat
+    st.markdown("---")
+    display_chat_section()
+
 if __name__ == "__main__":
     try:
         Config.validate()
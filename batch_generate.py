@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Batch diet plan generation for cohorts of user profiles.
+
+Reads UserProfile records from JSONL or CSV, generates WeeklyDietPlans with a
+bounded pool of async workers and a rate limit, appends each result to a JSONL
+output file as soon as it is ready, and skips already-completed records when
+re-run against the same output file (the output doubles as the checkpoint).
+
+Usage:
+    python batch_generate.py profiles.jsonl plans.jsonl --workers 16 --rate 120
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from models import UserProfile
+from ai_dietitian import AIDietitian
+from llm_backends import create_backend
+
+# UserProfile list fields, stored as ";"-separated values in CSV input
+_CSV_LIST_FIELDS = {
+    "dietary_restrictions",
+    "allergies",
+    "preferences",
+    "dislikes",
+    "cultural_preferences",
+}
+_CSV_ROUTINE_FIELDS = ("wake_time", "bed_time", "work_schedule")
+
+
+class AsyncRateLimiter:
+    """Token bucket limiting how many requests start per minute"""
+
+    def __init__(self, per_minute: float, burst: int = 1):
+        self.interval = 60.0 / per_minute
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) / self.interval)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.interval)
+
+
+def _csv_row_to_profile_data(row: Dict[str, str]) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    for key, value in row.items():
+        if key is None or key in _CSV_ROUTINE_FIELDS:
+            continue
+        value = (value or "").strip()
+        if key in _CSV_LIST_FIELDS:
+            data[key] = [v.strip() for v in value.split(";") if v.strip()]
+        else:
+            data[key] = value or None
+    data["daily_routine"] = {field: (row.get(field) or "").strip() for field in _CSV_ROUTINE_FIELDS}
+    return data
+
+
+def read_profiles(path: str) -> Iterator[Tuple[str, Union[Dict[str, Any], ValueError]]]:
+    """Yield (record_id, raw profile dict) pairs from a JSONL or CSV file.
+
+    The record id is the "id" column/key when present, else the 1-based row number.
+    A malformed JSONL line yields its ValueError in place of the dict, so the run
+    records it as a failure like any other invalid profile.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            for index, row in enumerate(csv.DictReader(f), 1):
+                data = _csv_row_to_profile_data(row)
+                yield str(data.pop("id", None) or index), data
+            return
+
+        index = 0
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            index += 1
+            try:
+                data = json.loads(line)
+                if not isinstance(data, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                yield str(index), ValueError(f"line {line_number}: {e}")
+                continue
+            yield str(data.pop("id", None) or index), data
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """Ids already written successfully to the output file"""
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Partially written line from an interrupted run
+                continue
+            if record.get("status") == "ok":
+                done.add(str(record["id"]))
+    return done
+
+
+def truncate_partial_line(output_path: str) -> None:
+    """Cut a partially written last line (from an interrupted run) so appends start clean"""
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            chunk = f.read(position - start)
+            if position == end and chunk.endswith(b"\n"):
+                return
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                return
+            position = start
+        f.truncate(0)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of values (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class BatchRunner:
+    """Generates plans for a stream of profiles and appends results to JSONL"""
+
+    def __init__(
+        self,
+        dietitian: AIDietitian,
+        output_path: str,
+        workers: int = 8,
+        rate_per_minute: Optional[float] = None,
+        timeout: Optional[float] = None,
+        per_day: bool = False,
+    ):
+        self.dietitian = dietitian
+        self.output_path = output_path
+        self.workers = workers
+        self.rate_limiter = AsyncRateLimiter(rate_per_minute) if rate_per_minute else None
+        self.timeout = timeout
+        self.per_day = per_day
+
+        self.latencies: List[float] = []
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def _write(self, out, records: List[Dict[str, Any]]) -> None:
+        out.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        out.flush()
+        os.fsync(out.fileno())
+
+    async def _writer(self, results: asyncio.Queue, out) -> None:
+        """Appends results off the event loop, one fsync for whatever has queued up meanwhile"""
+        finished = False
+        while not finished:
+            batch = [await results.get()]
+            while not results.empty():
+                batch.append(results.get_nowait())
+            finished = batch[-1] is None
+            records = [record for record in batch if record is not None]
+            if records:
+                await asyncio.to_thread(self._write, out, records)
+
+    async def _process(
+        self, record_id: str, data: Union[Dict[str, Any], ValueError]
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            if isinstance(data, ValueError):
+                # Unreadable input line from read_profiles
+                raise data
+            profile = UserProfile(**data)
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            # Latency excludes time spent waiting on the rate limiter
+            started = time.perf_counter()
+            if self.per_day:
+                plan = await self.dietitian.acreate_diet_plan_per_day(profile, timeout=self.timeout)
+            else:
+                plan = await self.dietitian.acreate_diet_plan(profile, timeout=self.timeout)
+            if plan is None:
+                raise ValueError("model returned an invalid plan")
+        except Exception as e:
+            self.failed += 1
+            return {
+                "id": record_id,
+                "status": "error",
+                "error": f"{type(e).__name__}: {e}",
+                "latency_s": round(time.perf_counter() - started, 3),
+            }
+        latency = time.perf_counter() - started
+        self.latencies.append(latency)
+        self.succeeded += 1
+        return {
+            "id": record_id,
+            "status": "ok",
+            "latency_s": round(latency, 3),
+            "plan": plan.model_dump(mode="json"),
+        }
+
+    async def _worker(self, queue: asyncio.Queue, results: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                await results.put(await self._process(*item))
+            finally:
+                queue.task_done()
+
+    async def run(
+        self, records: Iterator[Tuple[str, Union[Dict[str, Any], ValueError]]]
+    ) -> Dict[str, Any]:
+        # Before reading the checkpoint, so a cut-off record is regenerated
+        truncate_partial_line(self.output_path)
+        done = load_checkpoint(self.output_path)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        results: asyncio.Queue = asyncio.Queue()
+        started = time.perf_counter()
+
+        with open(self.output_path, "a", encoding="utf-8") as out:
+            writer = asyncio.create_task(self._writer(results, out))
+            tasks = [asyncio.create_task(self._worker(queue, results)) for _ in range(self.workers)]
+            for record_id, data in records:
+                if record_id in done:
+                    self.skipped += 1
+                    continue
+                await queue.put((record_id, data))
+            for _ in tasks:
+                await queue.put(None)
+            await asyncio.gather(*tasks)
+            await results.put(None)
+            await writer
+
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed_s": round(elapsed, 2),
+            "plans_per_min": round(self.succeeded / elapsed * 60, 2) if elapsed else 0.0,
+            "p50_latency_s": round(percentile(self.latencies, 50), 3),
+            "p95_latency_s": round(percentile(self.latencies, 95), 3),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate diet plans for a cohort of profiles")
+    parser.add_argument("input", help="Profiles as .jsonl or .csv")
+    parser.add_argument("output", help="Results .jsonl (also used to resume)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent plan generations")
+    parser.add_argument("--rate", type=float, default=None, help="Max requests started per minute")
+    parser.add_argument("--timeout", type=float, default=None, help="Per-profile timeout in seconds")
+    parser.add_argument("--per-day", action="store_true", help="Generate the seven days concurrently")
+    parser.add_argument("--backend", default=None, help="LLM backend (gemini or fake)")
+    args = parser.parse_args()
+
+    dietitian = AIDietitian(backend=create_backend(args.backend), max_concurrency=args.workers)
+    runner = BatchRunner(
+        dietitian,
+        args.output,
+        workers=args.workers,
+        rate_per_minute=args.rate,
+        timeout=args.timeout,
+        per_day=args.per_day,
+    )
+    report = asyncio.run(runner.run(read_profiles(args.input)))
+
+    print("📊 Batch complete")
+    print(f"   Succeeded: {report['succeeded']}  Failed: {report['failed']}  "
+          f"Skipped (checkpoint): {report['skipped']}")
+    print(f"   Throughput: {report['plans_per_min']} plans/min over {report['elapsed_s']}s")
+    print(f"   Latency p50: {report['p50_latency_s']}s  p95: {report['p95_latency_s']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Fixed synthetic inputs shared by the benchmarks"""
+
+import random
+from typing import Dict, List
+
+from llm_backends import synthetic_user_profile, synthetic_weekly_plan
+from models import UserProfile, WeeklyDietPlan
+
+SEED = 42
+
+
+def user_profile() -> UserProfile:
+    return synthetic_user_profile(random.Random(SEED))
+
+
+def weekly_plan() -> WeeklyDietPlan:
+    return synthetic_weekly_plan(user_profile(), random.Random(SEED))
+
+
+def weekly_plan_json() -> str:
+    return weekly_plan().model_dump_json()
+
+
+def conversation(turns: int = 20) -> List[Dict[str, str]]:
+    """Alternating user/assistant chat history of the given length"""
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"Message {i}: I am vegetarian and walk 30 minutes a day."})
+        history.append({"role": "assistant", "content": f"Reply {i}: Great, let's plan protein-rich Indian meals."})
+    return history
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Cold-start import time of the app's entry modules.
+
+Each module is imported in a fresh interpreter under ``python -X importtime``,
+several times, and the best run is kept. The report lists total import time
+and the heaviest top-level packages pulled in, so a new eager import of a
+large dependency shows up as a regression. Results are written to JSON like
+run_benchmarks; pass --compare to diff against an earlier results file.
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --modules app cohort_export --compare before.json
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.results_io import compare, save_results
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    "app",
+    "ai_dietitian",
+    "llm_backends",
+    "batch_generate",
+    "cohort_export",
+    "pdf_generator",
+    "generate_report_docx",
+]
+
+# "import time:  self [us] | cumulative | imported package"
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_once(module: str) -> Dict[str, Any]:
+    """Import module in a fresh interpreter and parse its -X importtime report"""
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+        raise ImportError(f"import {module} failed: {error}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            # Two spaces of indentation per nesting level
+            depth = (len(match.group(3)) - 1) // 2
+            entries.append((depth, match.group(4), int(match.group(2))))
+
+    # Children are reported before their parent; walk in reverse to see parents first
+    total_us = 0
+    packages: Dict[str, int] = {}
+    chain: List[Tuple[int, str]] = []  # (depth, top-level package) of the current import chain
+    inside = False
+    for depth, name, cumulative in reversed(entries):
+        root = name.split(".")[0]
+        if depth == 0:
+            inside = name == module
+            if inside:
+                total_us = cumulative
+            chain = [(0, root)]
+            continue
+        while chain and chain[-1][0] >= depth:
+            chain.pop()
+        if inside and all(root != outer for _, outer in chain):
+            # Outermost import of this package under the module (nested packages overlap)
+            packages[root] = packages.get(root, 0) + cumulative
+        chain.append((depth, root))
+    return {"total_us": total_us, "packages": packages}
+
+
+def measure(module: str, repeat: int, top: int) -> Dict[str, Any]:
+    """Best of repeat cold imports, with the top heaviest packages of that run"""
+    best = min((measure_once(module) for _ in range(repeat)), key=lambda run: run["total_us"])
+    heaviest = sorted(best["packages"].items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "total_ms": best["total_us"] / 1000,
+        "heaviest_ms": {name: us / 1000 for name, us in heaviest},
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of NutriAI modules")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module (best kept)")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages to report per module")
+    parser.add_argument("--output", default=None, help="Results JSON path (default: benchmarks/results/)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for module in args.modules:
+        try:
+            result = measure(module, args.repeat, args.top)
+        except ImportError as e:
+            print(f"  {module:<24} skipped ({e})")
+            continue
+        results[module] = result
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in result["heaviest_ms"].items())
+        print(f"  {module:<24} {result['total_ms']:>9.1f} ms   ({heaviest})")
+
+    save_results(results, args.output, "imports")
+
+    if args.compare:
+        compare(results, args.compare, "total_ms", "ms", name_width=24)
+
+
+if __name__ == "__main__":
+    main()
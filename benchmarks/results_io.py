@@ -0,0 +1,52 @@
+"""
+Results files shared by the benchmark scripts: each run is saved as JSON with
+the interpreter and platform it ran on, and can be compared against an earlier
+file metric by metric.
+"""
+
+import json
+import os
+import platform
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def save_results(results: Dict[str, Dict[str, Any]], output: Optional[str], prefix: str) -> str:
+    """Write results to output (default: RESULTS_DIR/<prefix>_<timestamp>.json); return the path"""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\n💾 Results saved to {output}")
+    return output
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline_path: str,
+    metric: str,
+    unit: str,
+    name_width: int = 40,
+) -> None:
+    """Print metric for every result also present in the baseline file, with the change"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"\nComparison against {baseline_path}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name][metric]
+        change = (result[metric] / before - 1) * 100 if before else 0.0
+        print(f"  {name:<{name_width}} {before:>10.1f} -> {result[metric]:>10.1f} {unit}  ({change:+.1f}%)")
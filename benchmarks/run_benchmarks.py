@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for plan generation, validation and PDF rendering.
+
+Every benchmark runs against fixed synthetic fixtures and the offline fake
+LLM backend, so results are comparable between runs and machines without
+network access. Results (ops/sec and peak traced memory) are written to JSON;
+pass --compare to diff against an earlier results file.
+
+Usage:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --only pdf --output after.json --compare before.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks import fixtures
+from benchmarks.results_io import compare, save_results
+
+# name -> setup function returning the operation to time
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+# Scratch files of the running benchmark, removed once it has been timed
+_scratch = contextlib.ExitStack()
+
+
+def benchmark(name: str):
+    """Register a setup function under name"""
+    def register(setup: Callable[[], Callable[[], Any]]):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _scratch_dir() -> str:
+    return _scratch.enter_context(tempfile.TemporaryDirectory(prefix="nutriai-bench-"))
+
+
+def _new_dietitian(**backend_options):
+    from ai_dietitian import AIDietitian
+    from llm_backends import FakeBackend
+
+    # Measure the uncached path
+    return AIDietitian(backend=FakeBackend(**backend_options), use_plan_cache=False)
+
+
+# ------------ benchmarks ------------
+
+@benchmark("validate_plan_json_loads")
+def _validate_plan_json_loads():
+    from models import WeeklyDietPlan
+
+    text = fixtures.weekly_plan_json()
+    return lambda: WeeklyDietPlan(**json.loads(text))
+
+
+@benchmark("validate_plan_model_validate_json")
+def _validate_plan_model_validate_json():
+    from models import WeeklyDietPlan
+
+    text = fixtures.weekly_plan_json()
+    return lambda: WeeklyDietPlan.model_validate_json(text)
+
+
+@benchmark("read_plan_records")
+def _read_plan_records():
+    from cohort_export import read_plans
+
+    path = os.path.join(_scratch_dir(), "plans.jsonl")
+    record = {"id": "1", "status": "ok", "latency_s": 1.0, "plan": fixtures.weekly_plan().model_dump(mode="json")}
+    with open(path, "w", encoding="utf-8") as f:
+        f.write((json.dumps(record) + "\n") * 50)
+    return lambda: sum(1 for _ in read_plans(path))
+
+
+@benchmark("recompute_plan_nutrition")
+def _recompute_plan_nutrition():
+    from nutrition_db import get_food_database, recompute_plan
+
+    plan = fixtures.weekly_plan()
+    get_food_database()
+    return lambda: recompute_plan(plan)
+
+
+@benchmark("build_profile_prompt")
+def _build_profile_prompt():
+    dietitian = _new_dietitian()
+    history = fixtures.conversation()
+    return lambda: dietitian._build_profile_prompt(history)
+
+
+@benchmark("pdf_generator_construct")
+def _pdf_generator_construct():
+    from pdf_generator import DietPlanPDFGenerator
+
+    return DietPlanPDFGenerator
+
+
+@benchmark("pdf_render_file")
+def _pdf_render_file():
+    from pdf_generator import DietPlanPDFGenerator
+
+    plan = fixtures.weekly_plan()
+    path = os.path.join(_scratch_dir(), "plan.pdf")
+    return lambda: DietPlanPDFGenerator().generate_diet_plan_pdf(plan, path)
+
+
+@benchmark("pdf_render_bytes")
+def _pdf_render_bytes():
+    from pdf_generator import DietPlanPDFGenerator
+
+    plan = fixtures.weekly_plan()
+    return lambda: DietPlanPDFGenerator().generate_diet_plan_pdf_bytes(plan)
+
+
+@benchmark("pdf_render_incremental_one_day_changed")
+def _pdf_render_incremental_one_day_changed():
+    from pdf_cache import PDFRenderCache
+    from pdf_generator import DietPlanPDFGenerator
+
+    plan = fixtures.weekly_plan()
+    fragment_cache = PDFRenderCache()
+    DietPlanPDFGenerator().generate_diet_plan_pdf_incremental(plan, fragment_cache)
+    edits = iter(range(10**9))
+
+    def op():
+        # A fresh edit to Monday each call, as if that day had just been regenerated
+        monday = plan.daily_plans[0].model_copy(update={"notes": f"Edit {next(edits)}"})
+        edited = plan.model_copy(update={"daily_plans": [monday] + plan.daily_plans[1:]})
+        return DietPlanPDFGenerator().generate_diet_plan_pdf_incremental(edited, fragment_cache)
+    return op
+
+
+@benchmark("end_to_end_fake_create_plan")
+def _end_to_end_fake_create_plan():
+    dietitian = _new_dietitian()
+    profile = fixtures.user_profile()
+    return lambda: dietitian.create_diet_plan(profile)
+
+
+@benchmark("end_to_end_fake_create_plan_per_day")
+def _end_to_end_fake_create_plan_per_day():
+    dietitian = _new_dietitian()
+    profile = fixtures.user_profile()
+    return lambda: dietitian.create_diet_plan_per_day(profile)
+
+
+# ------------ harness ------------
+
+def run_benchmark(name: str, min_time: float) -> Dict[str, Any]:
+    """Time one benchmark: ops/sec over at least min_time, plus peak traced memory of one call"""
+    with _scratch:
+        return _time_benchmark(BENCHMARKS[name](), min_time)
+
+
+def _time_benchmark(op: Callable[[], Any], min_time: float) -> Dict[str, Any]:
+    op()  # warm-up (imports, lazy caches)
+
+    tracemalloc.start()
+    op()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    iterations = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        op()
+        iterations += 1
+        elapsed = time.perf_counter() - started
+
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / elapsed,
+        "mean_ms": elapsed / iterations * 1000,
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run the NutriAI benchmark suite")
+    parser.add_argument("--only", default=None, help="Run benchmarks whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to run each benchmark")
+    parser.add_argument("--output", default=None, help="Results JSON path (default: benchmarks/results/)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    names = [n for n in BENCHMARKS if not args.only or args.only in n]
+    results = {}
+    for name in names:
+        result = run_benchmark(name, args.min_time)
+        results[name] = result
+        print(f"  {name:<40} {result['ops_per_sec']:>10.1f} ops/s  "
+              f"{result['mean_ms']:>9.3f} ms  peak {result['peak_memory_kb']:>9.1f} KiB")
+
+    save_results(results, args.output, "bench")
+
+    if args.compare:
+        compare(results, args.compare, "ops_per_sec", "ops/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Bounded conversation memory for chat.
+
+The latest messages are sent verbatim. Older ones are folded, a chunk at a
+time, into a running summary that is generated once and cached under a hash
+of the messages it covers, so every later turn reuses it. Each request is
+capped at a token budget, keeping prompt size (and so latency and cost)
+roughly constant however long a consultation runs.
+
+Messages use the Gemini chat format: {"role": "user" | "model", "parts": str}.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from plan_cache import canonical_key
+
+SUMMARY_INSTRUCTION = (
+    "You maintain running notes of a consultation between a user and their dietitian. "
+    "Keep every fact that matters for diet advice: personal details, goals, health "
+    "conditions, allergies, likes and dislikes, routine, and advice already given."
+)
+# Rough characters per token for English text; exact counts would need an API call
+_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // _CHARS_PER_TOKEN + 1
+
+
+def _message_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(estimate_tokens(m["parts"]) for m in messages)
+
+
+def format_transcript(messages: List[Dict[str, str]]) -> str:
+    return "\n".join(
+        f"{'ASSISTANT' if m['role'] == 'model' else 'USER'}: {m['parts']}" for m in messages
+    )
+
+
+class ChatMemory:
+    """Decides what of a conversation is sent verbatim and caches summaries of the rest"""
+
+    def __init__(
+        self,
+        recent_messages: int = 12,
+        summary_chunk: int = 8,
+        token_budget: int = 6000,
+        summary_max_words: int = 200,
+        max_summaries: int = 512,
+    ):
+        self.recent_messages = recent_messages
+        self.summary_chunk = max(1, summary_chunk)
+        self.token_budget = token_budget
+        self.summary_max_words = summary_max_words
+        self.max_summaries = max_summaries
+        self.hits = 0
+        self.misses = 0
+
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> Optional["ChatMemory"]:
+        """ChatMemory from Config, or None when chat memory is disabled"""
+        if not Config.CHAT_MEMORY_ENABLED:
+            return None
+        return cls(
+            recent_messages=Config.CHAT_RECENT_MESSAGES,
+            summary_chunk=Config.CHAT_SUMMARY_CHUNK_MESSAGES,
+            token_budget=Config.CHAT_TOKEN_BUDGET,
+            summary_max_words=Config.CHAT_SUMMARY_MAX_WORDS,
+        )
+
+    def boundary(self, message_count: int) -> int:
+        """Number of leading messages covered by the summary.
+
+        It advances a whole chunk at a time, so the summary is extended once
+        per summary_chunk messages rather than on every turn.
+        """
+        folded = max(0, message_count - self.recent_messages)
+        return folded // self.summary_chunk * self.summary_chunk
+
+    def _chunk_keys(self, namespace: str, messages: List[Dict[str, str]], boundary: int) -> List[str]:
+        """keys[i] identifies the summary of messages[:i * summary_chunk]"""
+        keys = [canonical_key("chat-summary", namespace)]
+        for end in range(self.summary_chunk, boundary + 1, self.summary_chunk):
+            keys.append(canonical_key(keys[-1], messages[end - self.summary_chunk:end]))
+        return keys
+
+    def summary_plan(
+        self, namespace: str, messages: List[Dict[str, str]], boundary: int
+    ) -> Tuple[Optional[str], int, List[Tuple[str, List[Dict[str, str]]]]]:
+        """Longest cached summary within boundary, how many messages it covers, and the
+        (key, chunk) pairs still to fold in"""
+        keys = self._chunk_keys(namespace, messages, boundary)
+        summary = None
+        done = 0
+        with self._lock:
+            for index in range(len(keys) - 1, 0, -1):
+                cached = self._summaries.get(keys[index])
+                if cached is not None:
+                    self._summaries.move_to_end(keys[index])
+                    summary, done = cached, index
+                    break
+            if len(keys) > 1:
+                if done == len(keys) - 1:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        pending = [
+            (keys[index], messages[(index - 1) * self.summary_chunk:index * self.summary_chunk])
+            for index in range(done + 1, len(keys))
+        ]
+        return summary, done * self.summary_chunk, pending
+
+    def store(self, key: str, summary: str) -> None:
+        with self._lock:
+            self._summaries[key] = summary
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.max_summaries:
+                self._summaries.popitem(last=False)
+
+    def summary_request(
+        self, previous: Optional[str], chunk: List[Dict[str, str]]
+    ) -> List[Dict[str, str]]:
+        """Chat messages asking the model to fold chunk into the previous summary"""
+        prompt = ""
+        if previous:
+            prompt += f"Notes so far:\n{previous}\n\n"
+        prompt += (
+            f"New messages:\n{format_transcript(chunk)}\n\n"
+            f"Rewrite the notes to include the new messages, in at most "
+            f"{self.summary_max_words} words. Reply with the notes only."
+        )
+        return [{"role": "user", "parts": prompt}]
+
+    def assemble(
+        self,
+        preamble: List[Dict[str, str]],
+        summary: Optional[str],
+        recent: List[Dict[str, str]],
+        message: str,
+    ) -> List[Dict[str, str]]:
+        """Request messages: preamble, summary, as much of recent as the budget allows, message"""
+        head = list(preamble)
+        if summary:
+            head.append({"role": "user", "parts": f"Notes on our conversation so far:\n{summary}"})
+            head.append({"role": "model", "parts": "Thanks, I'll keep those in mind."})
+        tail = [{"role": "user", "parts": message}]
+
+        # Oldest verbatim messages give way first; the summary catches up with them
+        # once the boundary passes
+        remaining = self.token_budget - _message_tokens(head) - _message_tokens(tail)
+        start = len(recent)
+        while start > 0 and estimate_tokens(recent[start - 1]["parts"]) <= remaining:
+            remaining -= estimate_tokens(recent[start - 1]["parts"])
+            start -= 1
+        # Don't open the verbatim part with a model reply to a dropped message
+        while start < len(recent) and recent[start]["role"] == "model":
+            start += 1
+        return head + recent[start:] + tail
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Streaming PDF export for a cohort of diet plans.
+
+Plans are pulled from an iterator one at a time, rendered, and written
+straight to the output: either a ZIP with one PDF per patient, or a single
+PDF with every plan's pages concatenated. Nothing per plan is kept after it
+has been written (the concatenated PDF keeps one file offset per PDF object
+for its cross-reference table), so memory stays flat however large the cohort.
+
+Usage:
+    python cohort_export.py plans.jsonl cohort.zip
+    python cohort_export.py plans.jsonl cohort.pdf --format pdf --workers 4
+"""
+
+import argparse
+import io
+import re
+import zipfile
+from array import array
+from collections import deque
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+from models import WeeklyDietPlan
+from pdf_service import PDFRenderService
+
+# Page attributes a page may inherit from its page-tree ancestors
+_INHERITED_PAGE_KEYS = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+
+class _PlanRecord(TypedDict, total=False):
+    """The fields of a batch_generate.py output record that export needs"""
+    status: str
+    plan: WeeklyDietPlan
+
+
+# Whole records are validated straight from JSON, other fields ignored. A TypedDict has
+# no model_validate_json, so this one needs a TypeAdapter
+_PLAN_RECORD_ADAPTER = TypeAdapter(_PlanRecord)
+
+
+def read_plans(path: str) -> Iterator[WeeklyDietPlan]:
+    """Plans from JSONL: batch_generate.py output records or one plan per line"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                # Bare plans have no "status" key; the text check spares them a
+                # second pass as a record (a plan mentioning "status" takes both)
+                if '"status"' in line:
+                    record = _PLAN_RECORD_ADAPTER.validate_json(line)
+                    if "status" in record:
+                        if record["status"] == "ok":
+                            # Failed generations have no plan
+                            yield record["plan"]
+                        continue
+                yield WeeklyDietPlan.model_validate_json(line)
+            except Exception as e:
+                print(f"Skipping line {line_number}: {e}")
+
+
+def render_pdfs(
+    plans: Iterable[WeeklyDietPlan], pdf_service: Optional[PDFRenderService] = None
+) -> Iterator[bytes]:
+    """PDF bytes for each plan, in order; rendered in pdf_service's workers when given"""
+    if pdf_service is not None:
+        yield from pdf_service.render_many(plans)
+        return
+    from pdf_generator import DietPlanPDFGenerator
+
+    generator = DietPlanPDFGenerator()
+    for plan in plans:
+        yield generator.generate_diet_plan_pdf_bytes(plan)
+
+
+def _archive_name(index: int, plan: WeeklyDietPlan) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", plan.user_profile.name).strip("_") or "patient"
+    return f"{index + 1:05d}_{slug}.pdf"
+
+
+class StreamingPDFWriter:
+    """Concatenates the pages of many PDFs into one, writing each as it arrives.
+
+    Objects are renumbered and written immediately; only their offsets and
+    the page object numbers are retained until close() writes the page tree,
+    cross-reference table and trailer.
+    """
+
+    _CATALOG = 1
+    _PAGE_TREE = 2
+
+    def __init__(self, output: BinaryIO):
+        self._out = output
+        self._position = 0
+        # Offset of object n at index n - 1; the catalog and page tree are written last
+        self._offsets = array("Q", [0, 0])
+        self._kids = array("Q")
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    @property
+    def page_count(self) -> int:
+        return len(self._kids)
+
+    def _write(self, data: bytes) -> None:
+        self._out.write(data)
+        self._position += len(data)
+
+    def _allocate(self) -> int:
+        self._offsets.append(0)
+        return len(self._offsets)
+
+    def _write_object(self, number: int, obj) -> None:
+        buffer = io.BytesIO()
+        obj.write_to_stream(buffer)
+        self._offsets[number - 1] = self._position
+        self._write(b"%d 0 obj\n" % number + buffer.getvalue() + b"\nendobj\n")
+
+    def append(self, pdf_bytes: bytes) -> None:
+        """Append every page of pdf_bytes to the output"""
+        from pypdf import PdfReader
+        from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject
+
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        numbers = {}
+        pending = deque()
+
+        def renumber(obj):
+            # Rewrites references in place; the reader is discarded after this document
+            if isinstance(obj, IndirectObject):
+                key = (obj.idnum, obj.generation)
+                if key not in numbers:
+                    numbers[key] = self._allocate()
+                    pending.append((numbers[key], obj.get_object()))
+                return IndirectObject(numbers[key], 0, None)
+            if isinstance(obj, DictionaryObject):
+                for name, value in list(obj.items()):
+                    obj[name] = renumber(value)
+            elif isinstance(obj, ArrayObject):
+                for i, value in enumerate(obj):
+                    obj[i] = renumber(value)
+            return obj
+
+        for page in reader.pages:
+            node = page.get("/Parent")
+            while node is not None:
+                node = node.get_object()
+                for name in _INHERITED_PAGE_KEYS:
+                    if name not in page and name in node:
+                        page[NameObject(name)] = node[name]
+                node = node.get("/Parent")
+            del page["/Parent"]
+
+            number = self._allocate()
+            reference = page.indirect_reference
+            numbers[(reference.idnum, reference.generation)] = number
+            renumber(page)
+            page[NameObject("/Parent")] = IndirectObject(self._PAGE_TREE, 0, None)
+            self._write_object(number, page)
+            self._kids.append(number)
+
+            while pending:
+                obj_number, obj = pending.popleft()
+                self._write_object(obj_number, renumber(obj))
+
+    def close(self) -> None:
+        """Write the page tree, catalog, cross-reference table and trailer"""
+        self._offsets[self._PAGE_TREE - 1] = self._position
+        self._write(b"%d 0 obj\n<< /Type /Pages /Count %d /Kids [" % (self._PAGE_TREE, len(self._kids)))
+        for start in range(0, len(self._kids), 1024):
+            self._write(b"".join(b" %d 0 R" % kid for kid in self._kids[start:start + 1024]))
+        self._write(b" ] >>\nendobj\n")
+
+        self._offsets[self._CATALOG - 1] = self._position
+        self._write(b"%d 0 obj\n<< /Type /Catalog /Pages %d 0 R >>\nendobj\n" % (self._CATALOG, self._PAGE_TREE))
+
+        xref_position = self._position
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self._offsets) + 1))
+        for start in range(0, len(self._offsets), 1024):
+            self._write(b"".join(b"%010d 00000 n \n" % o for o in self._offsets[start:start + 1024]))
+        self._write(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(self._offsets) + 1, self._CATALOG, xref_position)
+        )
+
+
+def export_zip(
+    plans: Iterable[WeeklyDietPlan],
+    output: Union[str, BinaryIO],
+    pdf_service: Optional[PDFRenderService] = None,
+) -> int:
+    """Write one PDF per plan into a ZIP archive; returns the number of plans"""
+    names = deque()
+
+    def named(plans):
+        for index, plan in enumerate(plans):
+            names.append(_archive_name(index, plan))
+            yield plan
+
+    count = 0
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for pdf_bytes in render_pdfs(named(plans), pdf_service):
+            archive.writestr(names.popleft(), pdf_bytes)
+            count += 1
+    return count
+
+
+def export_pdf(
+    plans: Iterable[WeeklyDietPlan],
+    output: Union[str, BinaryIO],
+    pdf_service: Optional[PDFRenderService] = None,
+) -> int:
+    """Write every plan's pages into a single PDF; returns the number of plans"""
+    if isinstance(output, str):
+        with open(output, "wb") as f:
+            return export_pdf(plans, f, pdf_service)
+
+    writer = StreamingPDFWriter(output)
+    count = 0
+    for pdf_bytes in render_pdfs(plans, pdf_service):
+        writer.append(pdf_bytes)
+        count += 1
+    writer.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a cohort of diet plans as one download")
+    parser.add_argument("input", help="Plans .jsonl (e.g. batch_generate.py output)")
+    parser.add_argument("output", help="Output .zip or .pdf")
+    parser.add_argument("--format", choices=("zip", "pdf"), default=None,
+                        help="Output format (default: from the output extension)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Render in this many worker processes (0 = in this process)")
+    args = parser.parse_args()
+
+    output_format = args.format or ("pdf" if args.output.lower().endswith(".pdf") else "zip")
+    export = export_pdf if output_format == "pdf" else export_zip
+    plans = read_plans(args.input)
+    if args.workers > 0:
+        with PDFRenderService(max_workers=args.workers) as pdf_service:
+            count = export(plans, args.output, pdf_service)
+    else:
+        count = export(plans, args.output)
+
+    print(f"📦 Exported {count} plans to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
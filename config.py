@@ -8,6 +8,70 @@ class Config:
     # Use Gemini 2.5 Flash
     GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
+    # "gemini" or "fake" (offline deterministic stand-in for load testing)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+    FAKE_LLM_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0"))
+    FAKE_LLM_FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+
+    # Async API: max in-flight upstream requests per AIDietitian
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    # Timeout of a single upstream HTTP attempt
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+
+    # Upstream resilience: transient errors (429/5xx/timeouts) are retried with jittered
+    # exponential backoff within a per-call deadline; the circuit opens after repeated failures.
+    # The deadline covers all attempts and is also the async API's default per-call timeout
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+    LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+    LLM_CALL_DEADLINE_SECONDS = float(os.getenv("LLM_CALL_DEADLINE_SECONDS", "180"))
+    # No retry is started with less than this left before the deadline
+    LLM_MIN_ATTEMPT_SECONDS = float(os.getenv("LLM_MIN_ATTEMPT_SECONDS", "1"))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+    # Extra attempts when the model returns JSON that fails validation
+    LLM_INVALID_JSON_RETRIES = int(os.getenv("LLM_INVALID_JSON_RETRIES", "2"))
+
+    # Chat memory: the latest messages are sent verbatim, older ones are folded (a chunk at
+    # a time) into a cached running summary, and each request is capped at a token budget
+    CHAT_MEMORY_ENABLED = os.getenv("CHAT_MEMORY_ENABLED", "true").lower() == "true"
+    CHAT_RECENT_MESSAGES = int(os.getenv("CHAT_RECENT_MESSAGES", "12"))
+    CHAT_SUMMARY_CHUNK_MESSAGES = int(os.getenv("CHAT_SUMMARY_CHUNK_MESSAGES", "8"))
+    CHAT_TOKEN_BUDGET = int(os.getenv("CHAT_TOKEN_BUDGET", "6000"))
+    CHAT_SUMMARY_MAX_WORDS = int(os.getenv("CHAT_SUMMARY_MAX_WORDS", "200"))
+
+    # Per-day plan generation: skeleton + seven concurrent day requests
+    PER_DAY_GENERATION = os.getenv("PER_DAY_GENERATION", "false").lower() == "true"
+    # Attempts per day before the whole plan fails
+    PER_DAY_MAX_ATTEMPTS = int(os.getenv("PER_DAY_MAX_ATTEMPTS", "3"))
+
+    # Locally computed BMR/TDEE targets given to the model (mifflin_st_jeor or harris_benedict)
+    ENERGY_TARGETS_IN_PROMPT = os.getenv("ENERGY_TARGETS_IN_PROMPT", "true").lower() == "true"
+    BMR_FORMULA = os.getenv("BMR_FORMULA", "mifflin_st_jeor")
+    # Warn when a plan's average daily calories miss the target by more than this fraction
+    CALORIE_TARGET_TOLERANCE = float(os.getenv("CALORIE_TARGET_TOLERANCE", "0.15"))
+
+    # Reuse plans across near-identical profiles (same age/weight band, goal, activity,
+    # restrictions and allergies), scaled to each user's calorie target; needs the plan cache
+    PLAN_TEMPLATES_ENABLED = os.getenv("PLAN_TEMPLATES_ENABLED", "false").lower() == "true"
+    PLAN_TEMPLATE_AGE_BAND_YEARS = int(os.getenv("PLAN_TEMPLATE_AGE_BAND_YEARS", "10"))
+    PLAN_TEMPLATE_WEIGHT_BAND_KG = float(os.getenv("PLAN_TEMPLATE_WEIGHT_BAND_KG", "5"))
+
+    # Recompute meal macros and totals from the bundled food-composition table
+    RECOMPUTE_NUTRITION = os.getenv("RECOMPUTE_NUTRITION", "true").lower() == "true"
+
+    # PDF rendering in a process pool (0 = one worker per CPU, queue = 4 x workers)
+    PDF_RENDER_IN_WORKERS = os.getenv("PDF_RENDER_IN_WORKERS", "true").lower() == "true"
+    PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "0"))
+    PDF_RENDER_QUEUE_DEPTH = int(os.getenv("PDF_RENDER_QUEUE_DEPTH", "0"))
+
+    # Rendered PDF cache (in-memory LRU, optional on-disk spill directory)
+    PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", "64"))
+    PDF_CACHE_SPILL_DIR = os.getenv("PDF_CACHE_SPILL_DIR", "")
+    PDF_CACHE_MAX_SPILL_MB = int(os.getenv("PDF_CACHE_MAX_SPILL_MB", "512"))
+    # Per-section page fragments reused across renders (per process; 0 = always render whole PDFs)
+    PDF_FRAGMENT_CACHE_MAX_MB = int(os.getenv("PDF_FRAGMENT_CACHE_MAX_MB", "32"))
+
     APP_TITLE = os.getenv("APP_TITLE", "Gemini AI Diet Planner")
     APP_DESCRIPTION = os.getenv("APP_DESCRIPTION", "Personalized diet planning with Gemini 2.5 Flash")
 
@@ -15,8 +79,16 @@ class Config:
     PDF_MARGIN = 50
     PDF_LINE_HEIGHT = 20
 
+    # Persistent cache of generated diet plans
+    PLAN_CACHE_ENABLED = os.getenv("PLAN_CACHE_ENABLED", "true").lower() == "true"
+    PLAN_CACHE_PATH = os.getenv("PLAN_CACHE_PATH", ".cache/plan_cache.sqlite3")
+    PLAN_CACHE_TTL_SECONDS = int(os.getenv("PLAN_CACHE_TTL_SECONDS", "86400"))
+    PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "1000"))
+
     @classmethod
     def validate(cls):
+        if cls.LLM_BACKEND.lower() == "fake":
+            return True
         if not cls.GEMINI_API_KEY:
             load_dotenv()
             cls.GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -0,0 +1,178 @@
+"""
+Daily energy and macronutrient targets computed locally from a UserProfile.
+
+BMR comes from Mifflin-St Jeor (default) or the revised Harris-Benedict
+equation, TDEE from the ActivityLevel multiplier, and the calorie target
+from a Goal adjustment with a minimum-intake floor. Protein is set per kg of
+body weight, fat as a share of energy and carbohydrate fills the rest.
+
+compute_targets works on NumPy arrays so whole cohorts are computed in one
+pass; targets_for_profile is the single-profile convenience wrapper.
+"""
+
+from typing import Dict, Iterable, NamedTuple, Union
+
+import numpy as np
+
+from models import ActivityLevel, Goal, UserProfile, WeeklyDietPlan
+
+ACTIVITY_MULTIPLIERS = {
+    ActivityLevel.SEDENTARY: 1.2,
+    ActivityLevel.LIGHTLY_ACTIVE: 1.375,
+    ActivityLevel.MODERATELY_ACTIVE: 1.55,
+    ActivityLevel.VERY_ACTIVE: 1.725,
+    ActivityLevel.EXTREMELY_ACTIVE: 1.9,
+}
+# Fraction of TDEE added to (or removed from) the calorie target
+GOAL_CALORIE_ADJUSTMENTS = {
+    Goal.WEIGHT_LOSS: -0.20,
+    Goal.WEIGHT_GAIN: 0.15,
+    Goal.MAINTENANCE: 0.0,
+    Goal.MUSCLE_GAIN: 0.10,
+    Goal.GENERAL_HEALTH: 0.0,
+}
+PROTEIN_G_PER_KG = {
+    Goal.WEIGHT_LOSS: 1.6,
+    Goal.WEIGHT_GAIN: 1.4,
+    Goal.MAINTENANCE: 1.2,
+    Goal.MUSCLE_GAIN: 1.8,
+    Goal.GENERAL_HEALTH: 1.0,
+}
+FAT_ENERGY_SHARE = 0.28
+KCAL_PER_G = {"protein": 4.0, "carbs": 4.0, "fat": 9.0}
+
+# Sex codes: 1 male, 0 female, 0.5 unknown (formulas use the midpoint)
+_MALE = {"male", "m", "man", "boy"}
+_FEMALE = {"female", "f", "woman", "girl"}
+# Minimum daily intake without clinical supervision
+_CALORIE_FLOOR = {1.0: 1500.0, 0.0: 1200.0}
+
+FORMULAS = ("mifflin_st_jeor", "harris_benedict")
+
+
+class NutritionTargets(NamedTuple):
+    """Daily targets for one profile"""
+    bmr: int
+    tdee: int
+    calories: int
+    protein_g: int
+    carbs_g: int
+    fat_g: int
+
+
+def sex_code(gender: str) -> float:
+    """1.0 male, 0.0 female, 0.5 when the profile doesn't say"""
+    value = (gender or "").strip().lower()
+    if value in _MALE:
+        return 1.0
+    if value in _FEMALE:
+        return 0.0
+    return 0.5
+
+
+def _codes(values: Iterable, table: Dict) -> np.ndarray:
+    # Enum members and their string values both map
+    lookup = {**{key.value: value for key, value in table.items()}, **table}
+    return np.asarray([lookup[value] for value in values], dtype=np.float64)
+
+
+def bmr(
+    age: np.ndarray, sex: np.ndarray, height_cm: np.ndarray, weight_kg: np.ndarray,
+    formula: str = "mifflin_st_jeor",
+) -> np.ndarray:
+    """Basal metabolic rate in kcal/day"""
+    age, sex, height_cm, weight_kg = (
+        np.asarray(a, dtype=np.float64) for a in (age, sex, height_cm, weight_kg)
+    )
+    if formula == "mifflin_st_jeor":
+        # +5 for men, -161 for women
+        return 10.0 * weight_kg + 6.25 * height_cm - 5.0 * age + (166.0 * sex - 161.0)
+    if formula == "harris_benedict":
+        # Roza & Shizgal (1984) revision, interpolated by sex code
+        male = 88.362 + 13.397 * weight_kg + 4.799 * height_cm - 5.677 * age
+        female = 447.593 + 9.247 * weight_kg + 3.098 * height_cm - 4.330 * age
+        return sex * male + (1.0 - sex) * female
+    raise ValueError(f"Unknown BMR formula {formula!r}; expected one of {FORMULAS}")
+
+
+def compute_targets(
+    age: np.ndarray,
+    sex: np.ndarray,
+    height_cm: np.ndarray,
+    weight_kg: np.ndarray,
+    activity_multiplier: np.ndarray,
+    goal_adjustment: np.ndarray,
+    protein_g_per_kg: np.ndarray,
+    formula: str = "mifflin_st_jeor",
+) -> Dict[str, np.ndarray]:
+    """Vectorized targets; every argument broadcasts against the others.
+
+    Returns float arrays keyed bmr, tdee, calories, protein_g, carbs_g, fat_g.
+    """
+    sex = np.asarray(sex, dtype=np.float64)
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+    basal = bmr(age, sex, height_cm, weight_kg, formula)
+    tdee = basal * np.asarray(activity_multiplier, dtype=np.float64)
+
+    calories = tdee * (1.0 + np.asarray(goal_adjustment, dtype=np.float64))
+    floor = np.where(sex >= 1.0, _CALORIE_FLOOR[1.0], _CALORIE_FLOOR[0.0])
+    # Never below the floor, unless maintenance itself is lower
+    calories = np.maximum(calories, np.minimum(floor, tdee))
+    calories = np.round(calories / 10.0) * 10.0
+
+    protein_g = weight_kg * np.asarray(protein_g_per_kg, dtype=np.float64)
+    fat_g = calories * FAT_ENERGY_SHARE / KCAL_PER_G["fat"]
+    remaining = calories - protein_g * KCAL_PER_G["protein"] - fat_g * KCAL_PER_G["fat"]
+    carbs_g = np.maximum(remaining, 0.0) / KCAL_PER_G["carbs"]
+
+    return {
+        "bmr": basal,
+        "tdee": tdee,
+        "calories": calories,
+        "protein_g": protein_g,
+        "carbs_g": carbs_g,
+        "fat_g": fat_g,
+    }
+
+
+def profile_targets(
+    profiles: Iterable[Union[UserProfile, Dict]], formula: str = "mifflin_st_jeor"
+) -> Dict[str, np.ndarray]:
+    """compute_targets for many profiles (models or their JSON dicts) at once"""
+    columns = {"age": [], "gender": [], "height_cm": [], "weight_kg": [], "activity_level": [], "goal": []}
+    for profile in profiles:
+        is_dict = isinstance(profile, dict)
+        for name, values in columns.items():
+            values.append(profile[name] if is_dict else getattr(profile, name))
+
+    return compute_targets(
+        age=np.asarray(columns["age"], dtype=np.float64),
+        sex=np.asarray([sex_code(g) for g in columns["gender"]], dtype=np.float64),
+        height_cm=np.asarray(columns["height_cm"], dtype=np.float64),
+        weight_kg=np.asarray(columns["weight_kg"], dtype=np.float64),
+        activity_multiplier=_codes(columns["activity_level"], ACTIVITY_MULTIPLIERS),
+        goal_adjustment=_codes(columns["goal"], GOAL_CALORIE_ADJUSTMENTS),
+        protein_g_per_kg=_codes(columns["goal"], PROTEIN_G_PER_KG),
+        formula=formula,
+    )
+
+
+def targets_for_profile(profile: UserProfile, formula: str = "mifflin_st_jeor") -> NutritionTargets:
+    """Rounded daily targets for one profile"""
+    targets = profile_targets([profile], formula)
+    return NutritionTargets(*(int(round(float(targets[name][0]))) for name in NutritionTargets._fields))
+
+
+def target_nutrients(targets: Dict[str, np.ndarray]) -> np.ndarray:
+    """(n, 4) calories/protein/carbs/fat, the order nutrition_analytics.target_deviation expects"""
+    return np.stack(
+        [targets["calories"], targets["protein_g"], targets["carbs_g"], targets["fat_g"]], axis=-1
+    )
+
+
+def plan_calorie_deviation(plan: WeeklyDietPlan, targets: NutritionTargets) -> float:
+    """Relative deviation of the plan's average daily calories from the target"""
+    if not plan.daily_plans or not targets.calories:
+        return 0.0
+    average = sum(day.total_calories for day in plan.daily_plans) / len(plan.daily_plans)
+    return average / targets.calories - 1.0
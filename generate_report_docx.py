@@ -1,8 +1,9 @@
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-
 def create_thesis_docx():
+    # python-docx is only needed when the report is actually built
+    from docx import Document
+    from docx.shared import Pt, Inches
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
     doc = Document()
 
     # Title Page
@@ -0,0 +1,85 @@
+"""
+Ingredient line parsing shared by the shopping list, nutrition lookup and
+portion scaling: "1 1/2 cups cooked rice, warm" -> (1.5, "cups", "cooked rice").
+"""
+
+import re
+from typing import Optional, Tuple
+
+# Grams (or millilitres, taken as grams) per unit
+MASS_UNITS = {
+    "g": 1, "gm": 1, "gms": 1, "gram": 1, "grams": 1, "gr": 1,
+    "kg": 1000, "mg": 0.001,
+    "ml": 1, "l": 1000, "litre": 1000, "litres": 1000, "liter": 1000, "liters": 1000,
+}
+# Fraction of the food's cup weight
+CUP_UNITS = {
+    "cup": 1, "cups": 1, "bowl": 1, "bowls": 1,
+    "katori": 0.625, "katoris": 0.625,
+    "tbsp": 1 / 16, "tablespoon": 1 / 16, "tablespoons": 1 / 16,
+    "tsp": 1 / 48, "teaspoon": 1 / 48, "teaspoons": 1 / 48,
+    "handful": 0.5, "handfuls": 0.5,
+    "pinch": 1 / 768, "pinches": 1 / 768,
+}
+# Multiple of the food's piece weight
+PIECE_UNITS = {
+    "piece": 1, "pieces": 1, "pc": 1, "pcs": 1, "nos": 1, "whole": 1,
+    "slice": 1, "slices": 1, "clove": 1, "cloves": 1,
+    "medium": 1, "small": 0.7, "large": 1.3,
+}
+_FRACTIONS = {"½": 0.5, "¼": 0.25, "¾": 0.75, "⅓": 1 / 3, "⅔": 2 / 3}
+_ARTICLES = {"a": 1.0, "an": 1.0}
+
+QUANTITY_RE = re.compile(
+    r"^\s*(?P<qty>\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?(?:\s*-\s*\d+(?:\.\d+)?)?|[½¼¾⅓⅔]|an?(?=\s))"
+    r"\s*(?P<rest>.*)$",
+    re.IGNORECASE,
+)
+
+
+def parse_quantity(text: str) -> float:
+    text = text.strip().lower()
+    if text in _FRACTIONS:
+        return _FRACTIONS[text]
+    if text in _ARTICLES:
+        return _ARTICLES[text]
+    if "-" in text:
+        # Ranges such as "2-3": take the midpoint
+        low, high = (float(part) for part in text.split("-"))
+        return (low + high) / 2
+    total = 0.0
+    for part in text.split():
+        if "/" in part:
+            numerator, denominator = part.split("/")
+            total += float(numerator) / float(denominator)
+        else:
+            total += float(part)
+    return total
+
+
+def normalize_name(name: str) -> str:
+    """Lower-cased food name without trailing notes ("onions, chopped" -> "onions")"""
+    name = name.split(",")[0].split("(")[0]
+    name = re.sub(r"^(?:of\s+)", "", name.strip(), flags=re.IGNORECASE)
+    return " ".join(name.lower().split())
+
+
+def parse_ingredient(ingredient: str) -> Tuple[Optional[float], Optional[str], str]:
+    """Split an ingredient line into (quantity, unit, normalised food name)"""
+    match = QUANTITY_RE.match(ingredient)
+    if not match:
+        return None, None, normalize_name(ingredient)
+
+    quantity = parse_quantity(match.group("qty"))
+    rest = match.group("rest")
+    unit_match = re.match(r"([a-zA-Z]+)\b\.?\s*(.*)$", rest)
+    if unit_match:
+        word = unit_match.group(1).lower()
+        if word in MASS_UNITS or word in CUP_UNITS or word in PIECE_UNITS:
+            return quantity, word, normalize_name(unit_match.group(2))
+    return quantity, None, normalize_name(rest)
+
+
+def ingredient_name(ingredient: str) -> str:
+    """Strip the leading quantity/unit and any trailing note from an ingredient line"""
+    return parse_ingredient(ingredient)[2]
@@ -0,0 +1,500 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from datetime import date
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from models import (
+    ActivityLevel,
+    DailyPlan,
+    DailyRoutine,
+    DietaryRestriction,
+    Goal,
+    MealPlan,
+    MealTime,
+    NutritionInfo,
+    PlanSkeleton,
+    UserProfile,
+    WeeklyDietPlan,
+)
+from plan_assembly import WEEK_DAYS, build_shopping_list, summarize_week
+from response_schemas import DAILY_PLAN_SCHEMA, PLAN_SKELETON_SCHEMA, WEEKLY_PLAN_SCHEMA
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
+
+class LLMBackend:
+    """Interface between AIDietitian and a text-generation model.
+
+    Chat messages use the Gemini format: {"role": "user" | "model", "parts": str}.
+    timeout, when given, caps the request in seconds (below the backend's own
+    per-request timeout); ResilientBackend passes what is left of its deadline.
+    """
+
+    model_name = "unknown"
+
+    def generate_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Return the model reply to a chat transcript"""
+        raise NotImplementedError
+
+    def generate_json(self, prompt: str, response_schema: Any, timeout: Optional[float] = None) -> str:
+        """Return raw JSON text constrained by response_schema"""
+        raise NotImplementedError
+
+    def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[str]:
+        """Yield the reply in text chunks as they arrive; one chunk by default"""
+        yield self.generate_chat(messages, system_instruction, timeout)
+
+    async def agenerate_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Async generate_chat; runs the blocking call in a worker thread by default"""
+        return await asyncio.to_thread(self.generate_chat, messages, system_instruction, timeout)
+
+    async def agenerate_json(
+        self, prompt: str, response_schema: Any, timeout: Optional[float] = None
+    ) -> str:
+        """Async generate_json; runs the blocking call in a worker thread by default"""
+        return await asyncio.to_thread(self.generate_json, prompt, response_schema, timeout)
+
+
+# ------------ Gemini ------------
+
+_MODEL_REGISTRY: Dict[Tuple[str, Optional[str], Optional[str]], "genai.GenerativeModel"] = {}
+_REGISTRY_LOCK = threading.Lock()
+_configured_api_key: Optional[str] = None
+
+
+def _genai():
+    """google.generativeai, imported on first use; it takes most of a second to import"""
+    import google.generativeai as genai
+
+    return genai
+
+
+def _configure(api_key: str) -> None:
+    """Run genai.configure once per key so the transport and its connections are reused"""
+    global _configured_api_key
+    if _configured_api_key == api_key:
+        return
+    with _REGISTRY_LOCK:
+        if _configured_api_key != api_key:
+            _genai().configure(api_key=api_key)
+            _configured_api_key = api_key
+            _MODEL_REGISTRY.clear()
+
+
+def _schema_key(response_schema: Any) -> Optional[str]:
+    if response_schema is None:
+        return None
+    if isinstance(response_schema, type):
+        return f"{response_schema.__module__}.{response_schema.__qualname__}"
+    return json.dumps(response_schema, sort_keys=True, default=str)
+
+
+def get_model(
+    model_name: str,
+    system_instruction: Optional[str] = None,
+    response_schema: Any = None,
+) -> "genai.GenerativeModel":
+    """Process-wide, thread-safe registry of configured GenerativeModel objects.
+
+    Models are keyed by (model name, system instruction, generation config); a
+    response_schema selects a JSON-mode generation config.
+    """
+    key = (model_name, system_instruction, _schema_key(response_schema))
+    model = _MODEL_REGISTRY.get(key)
+    if model is not None:
+        return model
+    with _REGISTRY_LOCK:
+        model = _MODEL_REGISTRY.get(key)
+        if model is None:
+            genai = _genai()
+            generation_config = None
+            if response_schema is not None:
+                generation_config = genai.GenerationConfig(
+                    response_mime_type="application/json",
+                    response_schema=response_schema,
+                )
+            model = genai.GenerativeModel(
+                model_name,
+                system_instruction=system_instruction,
+                generation_config=generation_config,
+            )
+            _MODEL_REGISTRY[key] = model
+    return model
+
+
+class GeminiBackend(LLMBackend):
+    """Backend calling the Google Gemini API"""
+
+    def __init__(self, model_name: Optional[str] = None):
+        Config.validate()
+        self.api_key = Config.GEMINI_API_KEY
+        self.model_name = model_name or Config.GEMINI_MODEL
+        # Bounds each HTTP request; ResilientBackend bounds the retries around it
+        self._request_options = {"timeout": Config.LLM_TIMEOUT_SECONDS}
+
+    def _options(self, timeout: Optional[float]) -> Dict[str, float]:
+        if timeout is None or timeout >= Config.LLM_TIMEOUT_SECONDS:
+            return self._request_options
+        return {"timeout": timeout}
+
+    def _model(self, system_instruction: Optional[str] = None, response_schema: Any = None):
+        # The SDK is imported and configured on the first request, not at construction
+        _configure(self.api_key)
+        return get_model(
+            self.model_name, system_instruction=system_instruction, response_schema=response_schema
+        )
+
+    def generate_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        model = self._model(system_instruction=system_instruction)
+        response = model.generate_content(messages, request_options=self._options(timeout))
+        return response.text
+
+    def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[str]:
+        model = self._model(system_instruction=system_instruction)
+        for chunk in model.generate_content(
+            messages, stream=True, request_options=self._options(timeout)
+        ):
+            # Chunks without text (e.g. safety metadata only) raise on .text
+            if chunk.parts:
+                yield chunk.text
+
+    def generate_json(self, prompt: str, response_schema: Any, timeout: Optional[float] = None) -> str:
+        model = self._model(response_schema=response_schema)
+        response = model.generate_content(prompt, request_options=self._options(timeout))
+        return response.text
+
+    async def agenerate_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        model = self._model(system_instruction=system_instruction)
+        response = await model.generate_content_async(
+            messages, request_options=self._options(timeout)
+        )
+        return response.text
+
+    async def agenerate_json(
+        self, prompt: str, response_schema: Any, timeout: Optional[float] = None
+    ) -> str:
+        model = self._model(response_schema=response_schema)
+        response = await model.generate_content_async(
+            prompt, request_options=self._options(timeout)
+        )
+        return response.text
+
+
+# ------------ offline fake ------------
+
+class FakeBackendError(RuntimeError):
+    """Simulated upstream failure raised by FakeBackend"""
+
+
+# name, ingredients, calories, protein, carbs, fat
+_FAKE_MEALS = {
+    MealTime.BREAKFAST: [
+        ("Vegetable Poha", ["60 g poha", "50 g peas", "50 g onion", "10 g peanut oil"], 360, 8.5, 55.0, 11.5),
+        ("Moong Dal Chilla", ["80 g moong dal", "50 g onion", "50 g tomato", "5 g ghee"], 330, 20.0, 50.0, 5.5),
+        ("Oats Upma", ["60 g oats", "50 g carrot", "50 g peas", "5 g peanut oil"], 320, 12.0, 48.0, 9.0),
+    ],
+    MealTime.LUNCH: [
+        ("Rajma Chawal", ["80 g rajma", "75 g rice", "50 g onion", "50 g tomato", "10 g ghee"], 650, 24.0, 110.0, 12.5),
+        ("Dal Tadka with Roti", ["60 g toor dal", "80 g wheat flour", "50 g spinach", "10 g ghee"], 580, 24.0, 90.0, 13.0),
+        ("Chole with Brown Rice", ["80 g chickpeas", "75 g brown rice", "50 g onion", "10 g peanut oil"], 640, 20.0, 104.0, 16.0),
+    ],
+    MealTime.DINNER: [
+        ("Palak Paneer with Roti", ["100 g paneer", "150 g spinach", "60 g wheat flour", "5 g ghee"], 560, 28.0, 46.0, 29.0),
+        ("Vegetable Khichdi", ["60 g rice", "40 g moong dal", "100 g mixed vegetables", "5 g ghee"], 450, 16.0, 76.0, 8.0),
+        ("Tofu Bhurji with Roti", ["120 g tofu", "50 g onion", "50 g tomato", "60 g wheat flour"], 430, 22.0, 50.0, 15.0),
+    ],
+    MealTime.SNACKS: [
+        ("Roasted Chana", ["40 g roasted chana"], 150, 8.0, 24.0, 2.5),
+        ("Fruit Bowl", ["150 g papaya", "100 g apple"], 120, 1.5, 30.0, 0.5),
+        ("Curd with Cucumber", ["150 g curd", "100 g cucumber"], 110, 6.0, 9.0, 6.0),
+    ],
+}
+
+
+_FAKE_RECOMMENDATIONS = (
+    "Eat slowly and stop when you are 80% full.",
+    "Include a source of protein in every meal.",
+)
+
+
+def synthetic_user_profile(rng: Optional[random.Random] = None) -> UserProfile:
+    """Build a random but schema-valid UserProfile"""
+    rng = rng or random.Random()
+    gender = rng.choice(["Male", "Female"])
+    height = rng.randint(150, 190)
+    weight = rng.randint(50, 110)
+    return UserProfile(
+        name=rng.choice(["Aarav", "Diya", "Kabir", "Meera", "Rohan", "Sana"]),
+        age=rng.randint(18, 70),
+        gender=gender,
+        height_cm=float(height),
+        weight_kg=float(weight),
+        target_weight_kg=float(weight - rng.randint(0, 10)),
+        activity_level=rng.choice(list(ActivityLevel)),
+        goal=rng.choice(list(Goal)),
+        dietary_restrictions=[rng.choice([DietaryRestriction.NONE, DietaryRestriction.VEGETARIAN])],
+        allergies=rng.sample(["Nuts", "Dairy", "Eggs", "Soy"], k=rng.randint(0, 2)),
+        preferences=["Indian"],
+        dislikes=[],
+        daily_routine=DailyRoutine(wake_time="7:00 AM", bed_time="11:00 PM", work_schedule="9-5"),
+        cooking_skill=rng.choice(["Beginner", "Intermediate", "Advanced"]),
+        budget_constraint="Medium",
+        cultural_preferences=["Indian"],
+    )
+
+
+def synthetic_daily_plan(day: str, rng: Optional[random.Random] = None) -> DailyPlan:
+    """Build a DailyPlan whose totals equal the sum of its meals"""
+    rng = rng or random.Random()
+    meals = []
+    for meal_time, options in _FAKE_MEALS.items():
+        name, ingredients, calories, protein, carbs, fat = rng.choice(options)
+        meals.append(
+            MealPlan(
+                meal_time=meal_time,
+                meal_name=name,
+                description=f"A simple home-style {name.lower()}.",
+                ingredients=list(ingredients),
+                instructions=["Prepare the ingredients.", "Cook and serve warm."],
+                nutrition_info=NutritionInfo(calories=calories, protein=protein, carbs=carbs, fat=fat),
+                prep_time="10 minutes",
+                cooking_time="20 minutes",
+                difficulty="Easy",
+            )
+        )
+    return DailyPlan(
+        day=day,
+        meals=meals,
+        total_calories=sum(m.nutrition_info.calories for m in meals),
+        total_protein=round(sum(m.nutrition_info.protein for m in meals), 1),
+        total_carbs=round(sum(m.nutrition_info.carbs for m in meals), 1),
+        total_fat=round(sum(m.nutrition_info.fat for m in meals), 1),
+        notes="Drink at least 2.5 litres of water.",
+    )
+
+
+def synthetic_weekly_plan(
+    user_profile: Optional[UserProfile] = None, rng: Optional[random.Random] = None
+) -> WeeklyDietPlan:
+    """Build a schema-valid seven-day WeeklyDietPlan"""
+    rng = rng or random.Random()
+    user_profile = user_profile or synthetic_user_profile(rng)
+    daily_plans = [synthetic_daily_plan(day, rng) for day in WEEK_DAYS]
+    return WeeklyDietPlan(
+        user_profile=user_profile,
+        daily_plans=daily_plans,
+        weekly_summary=summarize_week(daily_plans),
+        recommendations=list(_FAKE_RECOMMENDATIONS),
+        shopping_list=build_shopping_list(daily_plans),
+        created_date=date.today().isoformat(),
+    )
+
+
+def synthetic_plan_skeleton(rng: Optional[random.Random] = None) -> PlanSkeleton:
+    """Build a schema-valid PlanSkeleton"""
+    rng = rng or random.Random()
+    return PlanSkeleton(
+        daily_calorie_target=rng.randrange(1400, 2600, 50),
+        daily_protein_target_g=float(rng.randrange(60, 130, 5)),
+        day_themes=[rng.choice(["North Indian", "South Indian", "Gujarati", "Bengali"]) for _ in WEEK_DAYS],
+        recommendations=list(_FAKE_RECOMMENDATIONS),
+    )
+
+
+def _embedded_json(prompt: str) -> Optional[Dict[str, Any]]:
+    """Return the first JSON object embedded in a prompt, if any"""
+    start = prompt.find("{")
+    while start != -1:
+        try:
+            obj, _ = json.JSONDecoder().raw_decode(prompt, start)
+            if isinstance(obj, dict):
+                return obj
+        except ValueError:
+            pass
+        start = prompt.find("{", start + 1)
+    return None
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic offline backend for load testing without network access.
+
+    Returns schema-valid UserProfile / WeeklyDietPlan JSON after an artificial
+    latency, and fails a configurable fraction of calls.
+    """
+
+    model_name = "fake"
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.0,
+        failure_rate: float = 0.0,
+        invalid_json_rate: float = 0.0,
+        seed: Optional[int] = 0,
+    ):
+        self.latency_seconds = latency_seconds
+        self.failure_rate = failure_rate
+        self.invalid_json_rate = invalid_json_rate
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def _maybe_fail(self) -> None:
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise FakeBackendError("Simulated upstream failure")
+
+    def _simulate_upstream(self, timeout: Optional[float] = None) -> None:
+        self.calls += 1
+        if timeout is not None and self.latency_seconds > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Simulated request timed out after {timeout:.1f}s")
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        self._maybe_fail()
+
+    async def _asimulate_upstream(self, timeout: Optional[float] = None) -> None:
+        self.calls += 1
+        if timeout is not None and self.latency_seconds > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError(f"Simulated request timed out after {timeout:.1f}s")
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        self._maybe_fail()
+
+    def _payload_rng(self, prompt: str) -> random.Random:
+        # Same prompt -> same payload, independent of call order
+        return random.Random(f"{self.seed}:{prompt}")
+
+    def generate_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        self._simulate_upstream(timeout)
+        return self._chat_reply(messages)
+
+    def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[str]:
+        # Latency is spread over the chunks; the first one arrives quickly
+        self.calls += 1
+        self._maybe_fail()
+        words = self._chat_reply(messages).split(" ")
+        delay = self.latency_seconds / len(words) if self.latency_seconds else 0
+        for index, word in enumerate(words):
+            if delay:
+                time.sleep(delay)
+            yield word if index == 0 else " " + word
+
+    def generate_json(self, prompt: str, response_schema: Any, timeout: Optional[float] = None) -> str:
+        self._simulate_upstream(timeout)
+        return self._json_reply(prompt, response_schema)
+
+    async def agenerate_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        await self._asimulate_upstream(timeout)
+        return self._chat_reply(messages)
+
+    async def agenerate_json(
+        self, prompt: str, response_schema: Any, timeout: Optional[float] = None
+    ) -> str:
+        await self._asimulate_upstream(timeout)
+        return self._json_reply(prompt, response_schema)
+
+    def _chat_reply(self, messages: List[Dict[str, str]]) -> str:
+        last = messages[-1]["parts"] if messages else ""
+        return (
+            "Thanks for sharing! Based on what you told me "
+            f"(\"{last[:60]}\"), I suggest balanced Indian meals with enough protein, "
+            "fibre-rich vegetables and regular hydration."
+        )
+
+    def _json_reply(self, prompt: str, response_schema: Any) -> str:
+        rng = self._payload_rng(prompt)
+
+        # Schemas may be the model classes or their generated dicts
+        if response_schema in (WeeklyDietPlan, WEEKLY_PLAN_SCHEMA):
+            profile = None
+            embedded = _embedded_json(prompt)
+            if embedded is not None:
+                try:
+                    profile = UserProfile(**embedded)
+                except Exception:
+                    profile = None
+            text = synthetic_weekly_plan(profile, rng).model_dump_json()
+        elif response_schema in (DailyPlan, DAILY_PLAN_SCHEMA):
+            text = synthetic_daily_plan("Day", rng).model_dump_json()
+        elif response_schema in (PlanSkeleton, PLAN_SKELETON_SCHEMA):
+            text = synthetic_plan_skeleton(rng).model_dump_json()
+        else:
+            text = synthetic_user_profile(rng).model_dump_json()
+
+        if self.invalid_json_rate and self._rng.random() < self.invalid_json_rate:
+            return text[: len(text) // 2]
+        return text
+
+
+def create_backend(name: Optional[str] = None, resilient: bool = True) -> LLMBackend:
+    """Build the backend selected by name or Config.LLM_BACKEND.
+
+    With resilient, the backend is wrapped in a ResilientBackend (retries,
+    backoff, deadline and circuit breaker).
+    """
+    name = (name or Config.LLM_BACKEND).lower()
+    if name == "gemini":
+        backend = GeminiBackend()
+    elif name == "fake":
+        backend = FakeBackend(
+            latency_seconds=Config.FAKE_LLM_LATENCY_SECONDS,
+            failure_rate=Config.FAKE_LLM_FAILURE_RATE,
+        )
+    else:
+        raise ValueError(f"Unknown LLM backend: {name}")
+    if not resilient:
+        return backend
+    # Imported here: resilience builds on this module
+    from resilience import ResilientBackend
+
+    return ResilientBackend(backend)
@@ -106,3 +106,10 @@ class WeeklyDietPlan(BaseModel):
     recommendations: List[str]
     shopping_list: List[str]
     created_date: str
+
+class PlanSkeleton(BaseModel):
+    """Profile-level outline shared by independently generated days"""
+    daily_calorie_target: int = Field(description="Calories per day for this user")
+    daily_protein_target_g: float = Field(description="Protein per day in grams")
+    day_themes: List[str] = Field(description="One short theme per day, Monday to Sunday, for variety")
+    recommendations: List[str] = Field(description="Personalized recommendations for the week")
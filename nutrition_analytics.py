@@ -0,0 +1,122 @@
+"""
+Columnar, vectorized nutrition analytics over many stored WeeklyDietPlans.
+
+plans_to_columns flattens every meal into parallel NumPy arrays in a single
+pass; the remaining functions work on those arrays without touching Python
+objects again.
+"""
+
+from typing import Any, Dict, Iterable, NamedTuple, Tuple, Union
+
+import numpy as np
+
+from models import MealTime, WeeklyDietPlan
+
+NUTRIENTS = ("calories", "protein", "carbs", "fat")
+MEAL_TIME_CODES = {meal_time.value: code for code, meal_time in enumerate(MealTime)}
+
+
+class MealColumns(NamedTuple):
+    """One row per meal across all plans"""
+    plan_index: np.ndarray  # int64, position of the plan in the input
+    day_index: np.ndarray  # int64, position of the day within its plan
+    meal_time: np.ndarray  # int8, MEAL_TIME_CODES (-1 if unknown)
+    nutrients: np.ndarray  # float64, shape (n_meals, 4) in NUTRIENTS order
+    n_plans: int
+    n_days: int
+
+
+def plans_to_columns(plans: Iterable[Union[WeeklyDietPlan, Dict[str, Any]]]) -> MealColumns:
+    """Flatten plans (models or their JSON dicts) into MealColumns"""
+    plan_index, day_index, meal_time, values = [], [], [], []
+    n_plans = 0
+    n_days = 0
+    for p, plan in enumerate(plans):
+        n_plans += 1
+        is_dict = isinstance(plan, dict)
+        daily_plans = plan["daily_plans"] if is_dict else plan.daily_plans
+        n_days = max(n_days, len(daily_plans))
+        for d, daily_plan in enumerate(daily_plans):
+            meals = daily_plan["meals"] if is_dict else daily_plan.meals
+            plan_index.extend([p] * len(meals))
+            day_index.extend([d] * len(meals))
+            for meal in meals:
+                if is_dict:
+                    info = meal["nutrition_info"]
+                    meal_time.append(MEAL_TIME_CODES.get(meal["meal_time"], -1))
+                    values.append((info["calories"], info["protein"], info["carbs"], info["fat"]))
+                else:
+                    info = meal.nutrition_info
+                    code = getattr(meal.meal_time, "value", meal.meal_time)
+                    meal_time.append(MEAL_TIME_CODES.get(code, -1))
+                    values.append((info.calories, info.protein, info.carbs, info.fat))
+
+    return MealColumns(
+        plan_index=np.asarray(plan_index, dtype=np.int64),
+        day_index=np.asarray(day_index, dtype=np.int64),
+        meal_time=np.asarray(meal_time, dtype=np.int8),
+        nutrients=np.asarray(values, dtype=np.float64).reshape(-1, len(NUTRIENTS)),
+        n_plans=n_plans,
+        n_days=n_days,
+    )
+
+
+def _day_slots(columns: MealColumns) -> Tuple[int, np.ndarray]:
+    """(number of (plan, day) slots, flat slot index of every meal)"""
+    flat = columns.plan_index * columns.n_days + columns.day_index
+    return columns.n_plans * columns.n_days, flat
+
+
+def _present_days(columns: MealColumns) -> np.ndarray:
+    """Boolean (n_plans, n_days): the day has at least one meal"""
+    slots, flat = _day_slots(columns)
+    return (np.bincount(flat, minlength=slots) > 0).reshape(columns.n_plans, columns.n_days)
+
+
+def daily_totals(columns: MealColumns) -> np.ndarray:
+    """Per-day nutrient sums, shape (n_plans, n_days, 4); missing days are 0"""
+    slots, flat = _day_slots(columns)
+    totals = np.empty((slots, len(NUTRIENTS)), dtype=np.float64)
+    for k in range(len(NUTRIENTS)):
+        totals[:, k] = np.bincount(flat, weights=columns.nutrients[:, k], minlength=slots)
+    return totals.reshape(columns.n_plans, columns.n_days, len(NUTRIENTS))
+
+
+def days_per_plan(columns: MealColumns) -> np.ndarray:
+    """Number of days with at least one meal, shape (n_plans,)"""
+    return _present_days(columns).sum(axis=1)
+
+
+def weekly_averages(columns: MealColumns) -> np.ndarray:
+    """Average daily nutrients per plan, shape (n_plans, 4)"""
+    totals = daily_totals(columns).sum(axis=1)
+    days = np.maximum(days_per_plan(columns), 1)
+    return totals / days[:, None]
+
+
+def target_deviation(columns: MealColumns, targets: np.ndarray) -> Dict[str, np.ndarray]:
+    """Daily deviation from targets.
+
+    targets is (4,) for one target shared by every plan, or (n_plans, 4).
+    Returns absolute deviations (n_plans, n_days, 4), relative deviations of
+    the weekly averages (n_plans, 4) and the mean absolute percentage error of
+    the daily values (n_plans, 4). Days without meals are excluded.
+    """
+    targets = np.broadcast_to(
+        np.asarray(targets, dtype=np.float64), (columns.n_plans, len(NUTRIENTS))
+    )
+    daily = daily_totals(columns)
+    present = _present_days(columns)
+
+    deviation = daily - targets[:, None, :]
+    safe_targets = np.where(targets == 0, np.nan, targets)
+    pct = np.abs(deviation) / safe_targets[:, None, :]
+    pct = np.where(present[:, :, None], pct, np.nan)
+    counted = np.sum(~np.isnan(pct), axis=1)
+    mape = np.where(counted > 0, np.nansum(pct, axis=1) / np.maximum(counted, 1), np.nan)
+
+    return {
+        "daily_deviation": np.where(present[:, :, None], deviation, 0.0),
+        "average_relative_deviation": weekly_averages(columns) / safe_targets - 1.0,
+        "mean_abs_pct_error": mape,
+    }
@@ -0,0 +1,203 @@
+import csv
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+from ingredients import CUP_UNITS, MASS_UNITS, PIECE_UNITS, QUANTITY_RE, normalize_name, parse_ingredient
+from models import DailyPlan, NutritionInfo, WeeklyDietPlan
+from plan_assembly import summarize_week, total_daily_plan
+
+FOOD_TABLE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "food_composition.csv"
+)
+
+_DEFAULT_GRAMS_PER_CUP = 240.0
+
+
+class Food(NamedTuple):
+    """Nutrients per 100 g plus typical portion weights"""
+    name: str
+    kcal: float
+    protein_g: float
+    carbs_g: float
+    fat_g: float
+    grams_per_piece: Optional[float]
+    grams_per_cup: Optional[float]
+
+
+def _rounding_step(unit: Optional[str], quantity: float) -> float:
+    """Sensible granularity for a scaled quantity in unit"""
+    if unit in MASS_UNITS:
+        if MASS_UNITS[unit] >= 1000:
+            return 0.05
+        return 5.0 if quantity >= 20 else 1.0
+    if unit in CUP_UNITS:
+        return 0.25
+    return 0.5
+
+
+def scale_ingredient(ingredient: str, factor: float) -> str:
+    """Ingredient line with its leading quantity multiplied by factor"""
+    match = QUANTITY_RE.match(ingredient)
+    if not match:
+        return ingredient
+    quantity, unit, _ = parse_ingredient(ingredient)
+    step = _rounding_step(unit, quantity * factor)
+    scaled = max(step, round(quantity * factor / step) * step)
+    text = f"{scaled:.2f}".rstrip("0").rstrip(".")
+    return ingredient[:match.start("qty")] + text + ingredient[match.end("qty"):]
+
+
+def _candidate_names(name: str) -> List[str]:
+    """name and its naive singulars.
+
+    Only whole names are tried: matching a word inside the name would turn
+    "butter milk" into butter or "egg noodles" into egg.
+    """
+    candidates = [name]
+    if name.endswith("es"):
+        candidates.append(name[:-2])
+    if name.endswith("s"):
+        candidates.append(name[:-1])
+    return candidates
+
+
+class FoodDatabase:
+    """Food-composition table loaded into an indexed in-memory SQLite database"""
+
+    def __init__(self, path: str = FOOD_TABLE_PATH, max_cached_names: int = 4096):
+        self.max_cached_names = max_cached_names
+        self._lock = threading.Lock()
+        # LRU of name -> lookup result; model output keeps producing new names
+        self._lookup_cache: "OrderedDict[str, Optional[Food]]" = OrderedDict()
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE food ("
+            " id INTEGER PRIMARY KEY, name TEXT NOT NULL, kcal REAL, protein_g REAL,"
+            " carbs_g REAL, fat_g REAL, grams_per_piece REAL, grams_per_cup REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE food_alias (alias TEXT PRIMARY KEY, food_id INTEGER NOT NULL)"
+        )
+        self._load(path)
+
+    def _load(self, path: str) -> None:
+        def number(value: str) -> Optional[float]:
+            return float(value) if value else None
+
+        with open(path, newline="", encoding="utf-8") as f:
+            for food_id, row in enumerate(csv.DictReader(f), 1):
+                self._conn.execute(
+                    "INSERT INTO food VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        food_id, row["name"], float(row["kcal"]), float(row["protein_g"]),
+                        float(row["carbs_g"]), float(row["fat_g"]),
+                        number(row["grams_per_piece"]), number(row["grams_per_cup"]),
+                    ),
+                )
+                aliases = [row["name"]] + [a for a in row["aliases"].split(";") if a]
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO food_alias VALUES (?, ?)",
+                    [(normalize_name(alias), food_id) for alias in aliases],
+                )
+        self._conn.commit()
+
+    def _query(self, alias: str) -> Optional[Food]:
+        row = self._conn.execute(
+            "SELECT f.name, f.kcal, f.protein_g, f.carbs_g, f.fat_g, f.grams_per_piece,"
+            " f.grams_per_cup FROM food_alias a JOIN food f ON f.id = a.food_id"
+            " WHERE a.alias = ?",
+            (alias,),
+        ).fetchone()
+        return Food(*row) if row else None
+
+    def lookup(self, name: str) -> Optional[Food]:
+        """Food whose name or alias is name (or its singular), else None"""
+        with self._lock:
+            if name in self._lookup_cache:
+                self._lookup_cache.move_to_end(name)
+                return self._lookup_cache[name]
+            food = None
+            for candidate in _candidate_names(name):
+                food = self._query(candidate)
+                if food is not None:
+                    break
+            self._lookup_cache[name] = food
+            if len(self._lookup_cache) > self.max_cached_names:
+                self._lookup_cache.popitem(last=False)
+            return food
+
+    def ingredient_grams(self, ingredient: str) -> Optional[Tuple[Food, float]]:
+        """Resolve an ingredient line to (food, grams), or None if it cannot be resolved"""
+        quantity, unit, name = parse_ingredient(ingredient)
+        food = self.lookup(name)
+        if food is None:
+            return None
+
+        if quantity is None:
+            # "Salt to taste" and similar only resolve for negligible-energy foods
+            return (food, 0.0) if food.kcal == 0 else None
+        if unit in MASS_UNITS:
+            return food, quantity * MASS_UNITS[unit]
+        if unit in CUP_UNITS:
+            return food, quantity * CUP_UNITS[unit] * (food.grams_per_cup or _DEFAULT_GRAMS_PER_CUP)
+        if food.grams_per_piece is None:
+            return (food, 0.0) if food.kcal == 0 else None
+        return food, quantity * PIECE_UNITS.get(unit, 1) * food.grams_per_piece
+
+    def meal_nutrition(self, ingredients: List[str]) -> Optional[NutritionInfo]:
+        """NutritionInfo summed over ingredients, or None if any cannot be resolved"""
+        if not ingredients:
+            return None
+        kcal = protein = carbs = fat = 0.0
+        for ingredient in ingredients:
+            resolved = self.ingredient_grams(ingredient)
+            if resolved is None:
+                return None
+            food, grams = resolved
+            factor = grams / 100.0
+            kcal += food.kcal * factor
+            protein += food.protein_g * factor
+            carbs += food.carbs_g * factor
+            fat += food.fat_g * factor
+        return NutritionInfo(
+            calories=int(round(kcal)),
+            protein=round(protein, 1),
+            carbs=round(carbs, 1),
+            fat=round(fat, 1),
+        )
+
+
+_database: Optional[FoodDatabase] = None
+_database_lock = threading.Lock()
+
+
+def get_food_database() -> FoodDatabase:
+    """Process-wide FoodDatabase, loaded on first use"""
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                _database = FoodDatabase()
+    return _database
+
+
+def recompute_daily_plan(daily_plan: DailyPlan, db: Optional[FoodDatabase] = None) -> DailyPlan:
+    """Derive meal macros from ingredients where possible and re-sum the day"""
+    db = db or get_food_database()
+    meals = []
+    for meal in daily_plan.meals:
+        nutrition = db.meal_nutrition(meal.ingredients)
+        # Meals with unresolvable ingredients keep the model's figures
+        meals.append(meal.model_copy(update={"nutrition_info": nutrition}) if nutrition else meal)
+    return total_daily_plan(daily_plan.model_copy(update={"meals": meals}))
+
+
+def recompute_plan(plan: WeeklyDietPlan, db: Optional[FoodDatabase] = None) -> WeeklyDietPlan:
+    """Recompute meal macros, DailyPlan totals and WeeklySummary locally"""
+    daily_plans = [recompute_daily_plan(daily_plan, db) for daily_plan in plan.daily_plans]
+    return plan.model_copy(
+        update={"daily_plans": daily_plans, "weekly_summary": summarize_week(daily_plans)}
+    )
@@ -0,0 +1,144 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config import Config
+from models import WeeklyDietPlan
+from plan_cache import canonical_key
+
+
+def plan_pdf_key(diet_plan: WeeklyDietPlan) -> str:
+    """Stable hash of everything that appears in the rendered PDF.
+
+    The title-page date comes from diet_plan.created_date, so the key
+    covers the whole document and does not change from day to day.
+    """
+    return canonical_key("pdf", diet_plan.model_dump(mode="json"))
+
+
+class PDFRenderCache:
+    """Size-bounded LRU of rendered PDF bytes with optional on-disk spill.
+
+    Entries evicted from memory are written to spill_dir (itself bounded by
+    max_spill_bytes, oldest files removed first) and promoted back on access.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        spill_dir: Optional[str] = None,
+        max_spill_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    @classmethod
+    def from_config(cls) -> "PDFRenderCache":
+        return cls(
+            max_bytes=Config.PDF_CACHE_MAX_MB * 1024 * 1024,
+            spill_dir=Config.PDF_CACHE_SPILL_DIR or None,
+            max_spill_bytes=Config.PDF_CACHE_MAX_SPILL_MB * 1024 * 1024,
+        )
+
+    @classmethod
+    def fragments_from_config(cls) -> Optional["PDFRenderCache"]:
+        """Memory-only cache for per-section page fragments, or None when disabled"""
+        if Config.PDF_FRAGMENT_CACHE_MAX_MB <= 0:
+            return None
+        return cls(max_bytes=Config.PDF_FRAGMENT_CACHE_MAX_MB * 1024 * 1024)
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached PDF bytes for key, or None"""
+        with self._lock:
+            pdf_bytes = self._entries.get(key)
+            if pdf_bytes is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pdf_bytes
+
+        if self.spill_dir:
+            try:
+                with open(self._spill_path(key), "rb") as f:
+                    pdf_bytes = f.read()
+            except OSError:
+                pdf_bytes = None
+            if pdf_bytes is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self.put(key, pdf_bytes)
+                return pdf_bytes
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, pdf_bytes: bytes) -> None:
+        """Store bytes, evicting (and spilling) least recently used entries over max_bytes"""
+        if len(pdf_bytes) > self.max_bytes:
+            self._spill(key, pdf_bytes)
+            return
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = pdf_bytes
+            self._size += len(pdf_bytes)
+            while self._size > self.max_bytes:
+                old_key, old_bytes = self._entries.popitem(last=False)
+                self._size -= len(old_bytes)
+                evicted.append((old_key, old_bytes))
+        for old_key, old_bytes in evicted:
+            self._spill(old_key, old_bytes)
+
+    def _spill(self, key: str, pdf_bytes: bytes) -> None:
+        if not self.spill_dir:
+            return
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            return
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, path)
+        self._trim_spill_dir()
+
+    def _trim_spill_dir(self) -> None:
+        files = []
+        for entry in os.scandir(self.spill_dir):
+            if entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_spill_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
@@ -5,107 +5,224 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.pdfgen import canvas
-from typing import List, Dict, Any
+from typing import List, Dict, Any, BinaryIO, Callable, Tuple, Union
+import io
 import os
+import uuid
 from datetime import datetime
 from models import WeeklyDietPlan, UserProfile, DailyPlan, MealPlan
+from plan_cache import canonical_key
+
+class _SharedTableStyle(TableStyle):
+    """TableStyle shared by every render and thread; commands cannot be added"""
+
+    def __init__(self, cmds):
+        super().__init__(cmds)
+        self._cmds = tuple(self._cmds)
+
+    def add(self, *cmd):
+        raise TypeError("Shared table styles are read-only; use TableStyle(parent=...)")
+
+
+# Built once at import and shared by every DietPlanPDFGenerator and thread.
+# Treat these as read-only: derive a new ParagraphStyle(parent=...) to customise.
+_SAMPLE_STYLES = getSampleStyleSheet()
+
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_SAMPLE_STYLES['Heading1'],
+    fontSize=24,
+    spaceAfter=30,
+    alignment=TA_CENTER,
+    textColor=colors.darkblue
+)
+
+SUBTITLE_STYLE = ParagraphStyle(
+    'CustomSubtitle',
+    parent=_SAMPLE_STYLES['Heading2'],
+    fontSize=18,
+    spaceAfter=20,
+    alignment=TA_CENTER,
+    textColor=colors.darkgreen
+)
+
+SECTION_STYLE = ParagraphStyle(
+    'CustomSection',
+    parent=_SAMPLE_STYLES['Heading3'],
+    fontSize=16,
+    spaceAfter=15,
+    textColor=colors.darkblue
+)
+
+NORMAL_STYLE = ParagraphStyle(
+    'CustomNormal',
+    parent=_SAMPLE_STYLES['Normal'],
+    fontSize=12,
+    spaceAfter=12,
+    alignment=TA_LEFT
+)
+
+MEAL_STYLE = ParagraphStyle(
+    'CustomMeal',
+    parent=_SAMPLE_STYLES['Heading4'],
+    fontSize=14,
+    spaceAfter=10,
+    textColor=colors.darkred
+)
+
+USER_INFO_TABLE_STYLE = _SharedTableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+    ('BACKGROUND', (1, 0), (1, -1), colors.white),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+WEEKLY_SUMMARY_TABLE_STYLE = _SharedTableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+DAILY_NUTRITION_TABLE_STYLE = _SharedTableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgreen),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
 
 class DietPlanPDFGenerator:
     """PDF generator for diet plans using ReportLab"""
     
     def __init__(self):
-        """Initialize the PDF generator with styles"""
-        self.styles = getSampleStyleSheet()
+        """Initialize the PDF generator with the shared styles"""
+        self.styles = _SAMPLE_STYLES
         self._setup_custom_styles()
     
     def _setup_custom_styles(self):
-        """Setup custom paragraph styles for the PDF"""
-        # Title style
-        self.title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.darkblue
-        )
-        
-        # Subtitle style
-        self.subtitle_style = ParagraphStyle(
-            'CustomSubtitle',
-            parent=self.styles['Heading2'],
-            fontSize=18,
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            textColor=colors.darkgreen
-        )
-        
-        # Section header style
-        self.section_style = ParagraphStyle(
-            'CustomSection',
-            parent=self.styles['Heading3'],
-            fontSize=16,
-            spaceAfter=15,
-            textColor=colors.darkblue
-        )
-        
-        # Normal text style
-        self.normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            spaceAfter=12,
-            alignment=TA_LEFT
-        )
-        
-        # Meal name style
-        self.meal_style = ParagraphStyle(
-            'CustomMeal',
-            parent=self.styles['Heading4'],
-            fontSize=14,
-            spaceAfter=10,
-            textColor=colors.darkred
-        )
+        """Point the custom paragraph styles at the module-level singletons"""
+        self.title_style = TITLE_STYLE
+        self.subtitle_style = SUBTITLE_STYLE
+        self.section_style = SECTION_STYLE
+        self.normal_style = NORMAL_STYLE
+        self.meal_style = MEAL_STYLE
     
     def generate_diet_plan_pdf(self, diet_plan: WeeklyDietPlan, output_path: str = None) -> str:
-        """Generate a comprehensive PDF diet plan"""
+        """Generate a comprehensive PDF diet plan and write it to output_path"""
         if output_path is None:
+            # The random suffix keeps concurrent renders from colliding on one file
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = f"diet_plan_{timestamp}.pdf"
+            output_path = f"diet_plan_{timestamp}_{uuid.uuid4().hex[:8]}.pdf"
         
-        # Create the PDF document
-        doc = SimpleDocTemplate(output_path, pagesize=A4)
+        self._build(diet_plan, output_path)
+        return output_path
+    
+    def generate_diet_plan_pdf_bytes(self, diet_plan: WeeklyDietPlan) -> bytes:
+        """Generate a comprehensive PDF diet plan in memory and return its bytes"""
+        buffer = io.BytesIO()
+        self._build(diet_plan, buffer)
+        return buffer.getvalue()
+    
+    def generate_diet_plan_pdf_incremental(self, diet_plan: WeeklyDietPlan, fragment_cache) -> bytes:
+        """Generate the PDF from per-section page fragments, re-rendering only changed sections
+        
+        fragment_cache is any bytes cache with get(key)/put(key, value), e.g.
+        a PDFRenderCache. Falls back to a full render when pypdf is missing.
+        """
+        try:
+            from pypdf import PdfReader, PdfWriter
+        except ImportError:
+            return self.generate_diet_plan_pdf_bytes(diet_plan)
+        
+        writer = PdfWriter()
+        for name, data, build in self._sections(diet_plan):
+            key = canonical_key("pdf-section", name, data)
+            fragment = fragment_cache.get(key)
+            if fragment is None:
+                fragment = self._render_flowables(build())
+                fragment_cache.put(key, fragment)
+            writer.append(PdfReader(io.BytesIO(fragment)))
+        
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        return buffer.getvalue()
+    
+    def _build(self, diet_plan: WeeklyDietPlan, output: Union[str, BinaryIO]):
+        """Lay out the story into output, a file path or a binary file object"""
+        doc = SimpleDocTemplate(output, pagesize=A4)
+        doc.build(self._build_story(diet_plan))
+    
+    def _build_story(self, diet_plan: WeeklyDietPlan) -> List:
+        """Create the flowables for every section of the document"""
         story = []
-        
-        # Add title page
-        story.extend(self._create_title_page(diet_plan.user_profile))
-        story.append(PageBreak())
-        
-        # Add user profile summary
-        story.extend(self._create_profile_summary(diet_plan.user_profile))
-        story.append(PageBreak())
-        
-        # Add weekly overview
-        story.extend(self._create_weekly_overview(diet_plan))
-        story.append(PageBreak())
-        
-        # Add daily meal plans
+        for i, (_, _, build) in enumerate(self._sections(diet_plan)):
+            if i:
+                story.append(PageBreak())
+            story.extend(build())
+        return story
+    
+    def _sections(self, diet_plan: WeeklyDietPlan) -> List[Tuple[str, Any, Callable[[], List]]]:
+        """Document sections in order as (name, data the section renders, flowable builder)
+        
+        Every section starts on a new page, so each can be rendered on its own
+        and the resulting pages concatenated.
+        """
+        user_profile = diet_plan.user_profile
+        profile_data = user_profile.model_dump(mode="json")
+        sections = [
+            # Title page
+            ("title", [profile_data, self._format_created_date(diet_plan.created_date)],
+             lambda: self._create_title_page(user_profile, diet_plan.created_date)),
+            # User profile summary
+            ("profile", profile_data, lambda: self._create_profile_summary(user_profile)),
+            # Weekly overview
+            ("overview", diet_plan.weekly_summary.model_dump(mode="json"),
+             lambda: self._create_weekly_overview(diet_plan)),
+        ]
+        # Daily meal plans
         for daily_plan in diet_plan.daily_plans:
-            story.extend(self._create_daily_plan(daily_plan))
-            story.append(PageBreak())
-        
-        # Add shopping list
-        story.extend(self._create_shopping_list(diet_plan.shopping_list))
-        story.append(PageBreak())
-        
-        # Add recommendations
-        story.extend(self._create_recommendations(diet_plan.recommendations))
-        
-        # Build the PDF
-        doc.build(story)
-        return output_path
+            sections.append(
+                ("day", daily_plan.model_dump(mode="json"),
+                 lambda daily_plan=daily_plan: self._create_daily_plan(daily_plan))
+            )
+        # Shopping list and recommendations
+        sections.append(
+            ("shopping", list(diet_plan.shopping_list),
+             lambda: self._create_shopping_list(diet_plan.shopping_list))
+        )
+        sections.append(
+            ("recommendations", list(diet_plan.recommendations),
+             lambda: self._create_recommendations(diet_plan.recommendations))
+        )
+        return sections
+    
+    def _render_flowables(self, flowables: List) -> bytes:
+        """Lay out flowables as a standalone PDF and return its bytes"""
+        buffer = io.BytesIO()
+        SimpleDocTemplate(buffer, pagesize=A4).build(flowables)
+        return buffer.getvalue()
+    
+    def _format_created_date(self, created_date: str = None) -> str:
+        """Human-readable plan date; falls back to today when the plan has none"""
+        if not created_date:
+            return datetime.now().strftime('%B %d, %Y')
+        try:
+            return datetime.fromisoformat(created_date).strftime('%B %d, %Y')
+        except ValueError:
+            return created_date
     
-    def _create_title_page(self, user_profile: UserProfile) -> List:
+    def _create_title_page(self, user_profile: UserProfile, created_date: str = None) -> List:
         """Create the title page of the PDF"""
         elements = []
         
@@ -119,8 +236,8 @@ class DietPlanPDFGenerator:
         elements.append(subtitle)
         elements.append(Spacer(1, 0.3*inch))
         
-        # Creation date
-        date_text = f"Generated on: {datetime.now().strftime('%B %d, %Y')}"
+        # Creation date, taken from the plan so the same plan always renders the same document
+        date_text = f"Generated on: {self._format_created_date(created_date)}"
         date_para = Paragraph(date_text, self.normal_style)
         elements.append(date_para)
         elements.append(Spacer(1, 0.5*inch))
@@ -138,16 +255,7 @@ class DietPlanPDFGenerator:
         ]
         
         user_table = Table(user_info, colWidths=[2*inch, 3*inch])
-        user_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 0), (1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        user_table.setStyle(USER_INFO_TABLE_STYLE)
         
         elements.append(user_table)
         elements.append(Spacer(1, 0.3*inch))
@@ -219,15 +327,7 @@ class DietPlanPDFGenerator:
         ]
         
         summary_table = Table(summary_data, colWidths=[2.5*inch, 2.5*inch])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        summary_table.setStyle(WEEKLY_SUMMARY_TABLE_STYLE)
         
         elements.append(summary_table)
         elements.append(Spacer(1, 0.3*inch))
@@ -251,15 +351,7 @@ class DietPlanPDFGenerator:
         ]
         
         nutrition_table = Table(nutrition_data, colWidths=[1.25*inch, 1.25*inch, 1.25*inch, 1.25*inch])
-        nutrition_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgreen),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        nutrition_table.setStyle(DAILY_NUTRITION_TABLE_STYLE)
         
         elements.append(nutrition_table)
         elements.append(Spacer(1, 0.2*inch))
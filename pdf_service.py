@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional
+
+from config import Config
+from models import WeeklyDietPlan
+
+
+class RenderQueueFullError(RuntimeError):
+    """Raised when the render queue is at its depth limit and the caller won't wait"""
+
+
+# Section fragments rendered by this worker process, created on first render
+_fragment_cache = None
+
+
+def _render_plan_json(plan_json: str) -> bytes:
+    """Worker entry point: validate the plan and render it to PDF bytes"""
+    global _fragment_cache
+    # Imported here so the parent process never pays for ReportLab unless it renders itself
+    from pdf_cache import PDFRenderCache
+    from pdf_generator import DietPlanPDFGenerator
+
+    plan = WeeklyDietPlan.model_validate_json(plan_json)
+    if _fragment_cache is None:
+        _fragment_cache = PDFRenderCache.fragments_from_config()
+    if _fragment_cache is None:
+        return DietPlanPDFGenerator().generate_diet_plan_pdf_bytes(plan)
+    return DietPlanPDFGenerator().generate_diet_plan_pdf_incremental(plan, _fragment_cache)
+
+
+class PDFRenderService:
+    """Renders diet plan PDFs in a pool of worker processes.
+
+    At most max_queue_depth renders are queued or running at once; submit()
+    blocks (or raises RenderQueueFullError) beyond that, so callers feel
+    backpressure instead of piling up work in memory.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue_depth: Optional[int] = None):
+        self.max_workers = max_workers or Config.PDF_RENDER_WORKERS or os.cpu_count() or 1
+        self.max_queue_depth = (
+            max_queue_depth or Config.PDF_RENDER_QUEUE_DEPTH or self.max_workers * 4
+        )
+        # spawn: forking a multi-threaded server process (e.g. Streamlit) is unsafe
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._slots = threading.BoundedSemaphore(self.max_queue_depth)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Renders queued or in progress"""
+        return self._pending
+
+    def _release(self, _future: Future) -> None:
+        with self._pending_lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def submit(
+        self, diet_plan: WeeklyDietPlan, block: bool = True, timeout: Optional[float] = None
+    ) -> "Future[bytes]":
+        """Queue a render and return a Future resolving to the PDF bytes"""
+        acquired = self._slots.acquire(timeout=timeout) if block else self._slots.acquire(False)
+        if not acquired:
+            raise RenderQueueFullError(
+                f"PDF render queue is full ({self.max_queue_depth} pending)"
+            )
+        with self._pending_lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(_render_plan_json, diet_plan.model_dump_json())
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def render(self, diet_plan: WeeklyDietPlan, timeout: Optional[float] = None) -> bytes:
+        """Render one plan in a worker and wait for the bytes"""
+        return self.submit(diet_plan, timeout=timeout).result(timeout)
+
+    def render_many(self, diet_plans: Iterable[WeeklyDietPlan]) -> Iterator[bytes]:
+        """Render plans on all workers, yielding PDF bytes in input order.
+
+        Plans are pulled from the iterable only as queue slots free up, so
+        memory stays bounded by the queue depth.
+        """
+        in_flight: deque = deque()
+        for diet_plan in diet_plans:
+            # Never hold more than the queue depth ourselves, or submit() could deadlock
+            while len(in_flight) >= self.max_queue_depth:
+                yield in_flight.popleft().result()
+            in_flight.append(self.submit(diet_plan))
+        while in_flight:
+            yield in_flight.popleft().result()
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "PDFRenderService":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
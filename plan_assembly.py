@@ -0,0 +1,59 @@
+from datetime import date
+from typing import Iterable, List
+
+from ingredients import ingredient_name
+from models import DailyPlan, UserProfile, WeeklyDietPlan, WeeklySummary
+
+WEEK_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def total_daily_plan(daily_plan: DailyPlan) -> DailyPlan:
+    """Copy of daily_plan whose totals are the sum of its meals"""
+    meals = daily_plan.meals
+    return daily_plan.model_copy(
+        update={
+            "total_calories": sum(m.nutrition_info.calories for m in meals),
+            "total_protein": round(sum(m.nutrition_info.protein for m in meals), 1),
+            "total_carbs": round(sum(m.nutrition_info.carbs for m in meals), 1),
+            "total_fat": round(sum(m.nutrition_info.fat for m in meals), 1),
+        }
+    )
+
+
+def summarize_week(daily_plans: List[DailyPlan]) -> WeeklySummary:
+    """WeeklySummary derived from the daily totals"""
+    days = len(daily_plans) or 1
+    return WeeklySummary(
+        total_calories=sum(d.total_calories for d in daily_plans),
+        avg_protein=round(sum(d.total_protein for d in daily_plans) / days, 1),
+        avg_carbs=round(sum(d.total_carbs for d in daily_plans) / days, 1),
+        avg_fat=round(sum(d.total_fat for d in daily_plans) / days, 1),
+    )
+
+
+def build_shopping_list(daily_plans: Iterable[DailyPlan]) -> List[str]:
+    """Sorted, de-duplicated ingredient names across all meals"""
+    names = {
+        ingredient_name(ing)
+        for daily_plan in daily_plans
+        for meal in daily_plan.meals
+        for ing in meal.ingredients
+    }
+    names.discard("")
+    return sorted(names)
+
+
+def assemble_weekly_plan(
+    user_profile: UserProfile,
+    daily_plans: List[DailyPlan],
+    recommendations: List[str],
+) -> WeeklyDietPlan:
+    """Build a WeeklyDietPlan locally from independently generated days"""
+    return WeeklyDietPlan(
+        user_profile=user_profile,
+        daily_plans=daily_plans,
+        weekly_summary=summarize_week(daily_plans),
+        recommendations=recommendations,
+        shopping_list=build_shopping_list(daily_plans),
+        created_date=date.today().isoformat(),
+    )
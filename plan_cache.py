@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from models import UserProfile, WeeklyDietPlan
+from config import Config
+
+# List fields of UserProfile whose order carries no meaning
+_SET_LIKE_FIELDS = (
+    "dietary_restrictions",
+    "allergies",
+    "preferences",
+    "dislikes",
+    "cultural_preferences",
+)
+# Fields shown to the user as given; they are kept verbatim in the canonical form
+_DISPLAY_FIELDS = ("name",)
+
+
+def canonical_key(*parts: Any) -> str:
+    """Return a stable SHA-256 hex digest of JSON-serialisable parts"""
+    payload = json.dumps(
+        parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _normalize_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split()).lower()
+    if isinstance(value, dict):
+        return {k: _normalize_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize_value(v) for v in value]
+    return value
+
+
+def normalize_profile(profile: UserProfile) -> Dict[str, Any]:
+    """Canonical dict form of a profile: trimmed, lower-cased, set-like lists sorted.
+
+    Display fields such as the name are left as given.
+    """
+    raw = profile.model_dump(mode="json")
+    data = _normalize_value(raw)
+    for field in _DISPLAY_FIELDS:
+        data[field] = raw[field]
+    for field in _SET_LIKE_FIELDS:
+        data[field] = sorted(set(data.get(field) or []))
+    return data
+
+
+class PlanCache:
+    """Persistent SQLite cache of validated diet plans with TTL and LRU eviction"""
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = 86400,
+        max_entries: int = 1000,
+        access_flush_every: int = 64,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.access_flush_every = access_flush_every
+        self.hits = 0
+        self.misses = 0
+        # Template lookups are counted apart so they don't skew the exact-match hit rate
+        self.template_hits = 0
+        self.template_misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Access times of hits not yet written; they only matter for LRU eviction, so
+        # they are written in one batch before evicting (or every access_flush_every hits)
+        self._pending_access: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS plan_cache ("
+            " key TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS plan_cache_last_access ON plan_cache (last_access)"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls) -> Optional["PlanCache"]:
+        """Build the cache described by Config, or None when disabled"""
+        if not Config.PLAN_CACHE_ENABLED:
+            return None
+        return cls(
+            Config.PLAN_CACHE_PATH,
+            ttl_seconds=Config.PLAN_CACHE_TTL_SECONDS,
+            max_entries=Config.PLAN_CACHE_MAX_ENTRIES,
+        )
+
+    def get(self, key: str, template: bool = False) -> Optional[WeeklyDietPlan]:
+        """Return the cached plan for key, or None on miss or expiry.
+
+        template=True counts the lookup under the template counters.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM plan_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM plan_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._pending_access.pop(key, None)
+                row = None
+            self._count(row is not None, template)
+            if row is None:
+                return None
+            payload = row[0]
+            self._pending_access[key] = now
+            if len(self._pending_access) >= self.access_flush_every:
+                self._flush_access()
+                self._conn.commit()
+        return WeeklyDietPlan.model_validate_json(payload)
+
+    def _flush_access(self) -> None:
+        """Write pending access times; the caller holds the lock and commits"""
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE plan_cache SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._pending_access.items()],
+            )
+            self._pending_access.clear()
+
+    def flush(self) -> None:
+        """Write access times of recent hits to disk"""
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+
+    def _count(self, hit: bool, template: bool) -> None:
+        if template:
+            if hit:
+                self.template_hits += 1
+            else:
+                self.template_misses += 1
+        elif hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def put(self, key: str, plan: WeeklyDietPlan) -> None:
+        """Store a plan and evict least recently used entries beyond max_entries"""
+        now = time.time()
+        payload = plan.model_dump_json()
+        with self._lock:
+            self._pending_access.pop(key, None)
+            # Eviction below is by last_access, so bring it up to date first
+            self._flush_access()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plan_cache (key, payload, created_at, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM plan_cache").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM plan_cache WHERE key IN ("
+                    " SELECT key FROM plan_cache ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Remove every cached plan"""
+        with self._lock:
+            self._pending_access.clear()
+            self._conn.execute("DELETE FROM plan_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM plan_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": size,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "template_hits": self.template_hits,
+            "template_misses": self.template_misses,
+        }
@@ -0,0 +1,85 @@
+"""
+Plan templates shared by near-identical profiles.
+
+Profiles are bucketed on the fields that shape the meals (age and weight
+bands, goal, activity level, dietary restrictions, allergies). A plan
+generated for one member of a bucket is reused for the others, with portions
+and macros scaled to each user's own calorie target. Name, preferences and
+dislikes are not part of the bucket.
+"""
+
+from typing import Any, Dict, Optional
+
+from config import Config
+from energy_targets import targets_for_profile
+from models import UserProfile, WeeklyDietPlan
+from nutrition_db import scale_ingredient
+from plan_assembly import build_shopping_list, summarize_week, total_daily_plan
+from plan_cache import normalize_profile
+
+# Templates needing more scaling than this are treated as a miss
+MIN_SCALE_FACTOR = 0.6
+MAX_SCALE_FACTOR = 1.6
+
+
+def profile_bucket(profile: UserProfile) -> Dict[str, Any]:
+    """Quantized view of the profile; equal buckets share a plan template"""
+    normalized = normalize_profile(profile)
+    return {
+        "age_band": int(profile.age // Config.PLAN_TEMPLATE_AGE_BAND_YEARS),
+        "weight_band": int(profile.weight_kg // Config.PLAN_TEMPLATE_WEIGHT_BAND_KG),
+        "goal": normalized["goal"],
+        "activity_level": normalized["activity_level"],
+        "dietary_restrictions": normalized["dietary_restrictions"],
+        "allergies": normalized["allergies"],
+    }
+
+
+def average_daily_calories(plan: WeeklyDietPlan) -> float:
+    if not plan.daily_plans:
+        return 0.0
+    return sum(day.total_calories for day in plan.daily_plans) / len(plan.daily_plans)
+
+
+def scale_plan(plan: WeeklyDietPlan, factor: float) -> WeeklyDietPlan:
+    """Copy of plan with every portion and macro multiplied by factor"""
+    daily_plans = []
+    for daily_plan in plan.daily_plans:
+        meals = []
+        for meal in daily_plan.meals:
+            info = meal.nutrition_info
+            meals.append(
+                meal.model_copy(
+                    update={
+                        "ingredients": [scale_ingredient(i, factor) for i in meal.ingredients],
+                        "nutrition_info": info.model_copy(
+                            update={
+                                "calories": int(round(info.calories * factor)),
+                                "protein": round(info.protein * factor, 1),
+                                "carbs": round(info.carbs * factor, 1),
+                                "fat": round(info.fat * factor, 1),
+                            }
+                        ),
+                    }
+                )
+            )
+        daily_plans.append(total_daily_plan(daily_plan.model_copy(update={"meals": meals})))
+    return plan.model_copy(
+        update={
+            "daily_plans": daily_plans,
+            "weekly_summary": summarize_week(daily_plans),
+            "shopping_list": build_shopping_list(daily_plans),
+        }
+    )
+
+
+def adapt_template(template: WeeklyDietPlan, profile: UserProfile) -> Optional[WeeklyDietPlan]:
+    """The template scaled to profile's calorie target, or None if it is too far off"""
+    current = average_daily_calories(template)
+    if current <= 0:
+        return None
+    factor = targets_for_profile(profile, Config.BMR_FORMULA).calories / current
+    if not MIN_SCALE_FACTOR <= factor <= MAX_SCALE_FACTOR:
+        return None
+    plan = template if abs(factor - 1.0) < 0.01 else scale_plan(template, factor)
+    return plan.model_copy(update={"user_profile": profile})
@@ -0,0 +1,56 @@
+"""
+Partial user profile updates for incremental extraction.
+
+ProfileUpdate mirrors UserProfile with every field optional, including the
+nested DailyRoutine, and is derived from the model so the two cannot drift.
+Fields left as None were not mentioned in the new turns. merge_profile
+applies an update on top of the last extracted profile.
+"""
+
+from typing import Any, Dict, NamedTuple, Optional, Type
+
+from pydantic import BaseModel, Field, TypeAdapter, create_model
+
+from models import UserProfile
+
+
+class ProfileExtraction(NamedTuple):
+    """Last extracted profile and how many conversation turns it covers"""
+    profile: Optional[UserProfile]
+    processed_turns: int
+
+
+def _partial_model(model: Type[BaseModel]) -> Type[BaseModel]:
+    """Copy of model with every field (recursively) optional and defaulting to None"""
+    fields: Dict[str, Any] = {}
+    for name, info in model.model_fields.items():
+        annotation = info.annotation
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            annotation = _partial_model(annotation)
+        fields[name] = (Optional[annotation], Field(default=None, description=info.description))
+    return create_model(f"{model.__name__}Update", __doc__=f"Partial {model.__name__}", **fields)
+
+
+ProfileUpdate = _partial_model(UserProfile)
+PROFILE_UPDATE_ADAPTER = TypeAdapter(ProfileUpdate)
+
+
+def _changes(update: BaseModel) -> Dict[str, Any]:
+    """Fields the update sets, nested models as dicts of their own set fields"""
+    changes = {}
+    for name, value in update:
+        if value is None:
+            continue
+        changes[name] = _changes(value) if isinstance(value, BaseModel) else value
+    return changes
+
+
+def merge_profile(profile: UserProfile, update: BaseModel) -> UserProfile:
+    """profile with the fields set in update replaced; lists are replaced whole"""
+    changes = _changes(update)
+    if "daily_routine" in changes:
+        changes["daily_routine"] = profile.daily_routine.model_copy(update=changes["daily_routine"])
+    if not changes:
+        return profile
+    # Validated, so a bad value from the model fails here rather than in the plan prompt
+    return UserProfile.model_validate({**profile.model_dump(), **changes})
@@ -0,0 +1,291 @@
+"""
+Retry, backoff and circuit breaking for upstream LLM calls.
+
+ResilientBackend wraps any LLMBackend. Transient failures (429, 5xx,
+timeouts, dropped connections) are retried with exponential backoff and
+full jitter until the per-call deadline, and each attempt is capped at the
+time left; a CircuitBreaker shared by all calls through the wrapper fails
+fast while the upstream is degraded. Invalid model
+output is not an upstream failure and is retried by AIDietitian instead.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from config import Config
+from llm_backends import FakeBackendError, LLMBackend
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying
+_TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+# google.api_core exception class names, matched by name so the SDK stays lazily imported
+_TRANSIENT_NAMES = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "DeadlineExceeded",
+    "GatewayTimeout",
+    "BadGateway",
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling upstream while the circuit breaker is open"""
+
+
+def is_transient(error: BaseException) -> bool:
+    """True for failures that a later retry may not hit"""
+    # asyncio.TimeoutError only became an alias of TimeoutError in Python 3.11
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError, FakeBackendError)):
+        return True
+    if type(error).__name__ in _TRANSIENT_NAMES:
+        return True
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and code in _TRANSIENT_STATUS:
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and status in _TRANSIENT_STATUS
+
+
+def backoff_delay(
+    attempt: int, base: float, cap: float, rng: Optional[random.Random] = None
+) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]"""
+    return (rng or random).uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive transient failures.
+
+    While open, calls fail immediately with CircuitOpenError. After
+    reset_seconds a single trial call is let through (half-open): success
+    closes the circuit, failure opens it again. A trial that neither
+    succeeds nor fails (cancelled, or never reported) is given up after
+    trial_timeout_seconds so another can start.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        trial_timeout_seconds: Optional[float] = None,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.trial_timeout_seconds = trial_timeout_seconds or reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._trial_started_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go upstream now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if (
+                self.state == self.HALF_OPEN
+                and self._trial_in_flight
+                and now - self._trial_started_at >= self.trial_timeout_seconds
+            ):
+                # The trial's outcome was never reported
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self._trial_started_at = now
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+            raise CircuitOpenError(
+                f"Upstream circuit is open after repeated failures; retry in {retry_in:.0f}s"
+            )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Give up a half-open trial whose outcome will never be known (e.g. cancelled)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+class ResilientBackend(LLMBackend):
+    """LLMBackend decorator adding retries, backoff, a deadline and a circuit breaker"""
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        deadline_seconds: Optional[float] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        rng: Optional[random.Random] = None,
+        min_attempt_seconds: Optional[float] = None,
+    ):
+        self.backend = backend
+        self.model_name = backend.model_name
+        self.max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = Config.LLM_BACKOFF_BASE_SECONDS if backoff_base is None else backoff_base
+        self.backoff_max = Config.LLM_BACKOFF_MAX_SECONDS if backoff_max is None else backoff_max
+        self.deadline_seconds = deadline_seconds or Config.LLM_CALL_DEADLINE_SECONDS
+        self.min_attempt_seconds = (
+            Config.LLM_MIN_ATTEMPT_SECONDS if min_attempt_seconds is None else min_attempt_seconds
+        )
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=Config.CIRCUIT_RESET_SECONDS,
+            trial_timeout_seconds=self.deadline_seconds,
+        )
+        self.rng = rng or random.Random()
+        self.retries = 0
+
+    def _next_delay(self, attempt: int, error: BaseException, deadline: float) -> float:
+        """Backoff before the next attempt; re-raise error when out of attempts or time"""
+        if attempt >= self.max_retries:
+            raise error
+        delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, self.rng)
+        if time.monotonic() + delay + self.min_attempt_seconds > deadline:
+            # Too little time would be left for the attempt to succeed
+            raise error
+        self.retries += 1
+        return delay
+
+    def _call(self, operation: Callable[[float], T]) -> T:
+        """Run operation(seconds left) with retries; the backend must honour that timeout"""
+        deadline = time.monotonic() + self.deadline_seconds
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = operation(deadline - time.monotonic())
+            except Exception as e:
+                if not is_transient(e):
+                    # The upstream answered; the request itself was bad
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                time.sleep(self._next_delay(attempt, e, deadline))
+                attempt += 1
+                continue
+            except BaseException:
+                # Interrupted before an outcome: free the half-open trial slot
+                self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def _acall(self, operation: Callable[[float], Awaitable[T]]) -> T:
+        deadline = time.monotonic() + self.deadline_seconds
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                remaining = deadline - time.monotonic()
+                result = await asyncio.wait_for(operation(remaining), timeout=remaining)
+            except Exception as e:
+                if not is_transient(e):
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                await asyncio.sleep(self._next_delay(attempt, e, deadline))
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled, e.g. by the caller's own timeout
+                self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def _timeout(self, remaining: float, timeout: Optional[float]) -> float:
+        return remaining if timeout is None else min(remaining, timeout)
+
+    def generate_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        return self._call(
+            lambda remaining: self.backend.generate_chat(
+                messages, system_instruction, self._timeout(remaining, timeout)
+            )
+        )
+
+    def generate_json(self, prompt: str, response_schema: Any, timeout: Optional[float] = None) -> str:
+        return self._call(
+            lambda remaining: self.backend.generate_json(
+                prompt, response_schema, self._timeout(remaining, timeout)
+            )
+        )
+
+    def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[str]:
+        def start(remaining: float):
+            # Only the request and first chunk are retried; a partly shown reply is not
+            chunks = iter(
+                self.backend.stream_chat(messages, system_instruction, self._timeout(remaining, timeout))
+            )
+            return next(chunks, None), chunks
+
+        first, chunks = self._call(start)
+        if first is not None:
+            yield first
+            yield from chunks
+
+    async def agenerate_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_instruction: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        return await self._acall(
+            lambda remaining: self.backend.agenerate_chat(
+                messages, system_instruction, self._timeout(remaining, timeout)
+            )
+        )
+
+    async def agenerate_json(
+        self, prompt: str, response_schema: Any, timeout: Optional[float] = None
+    ) -> str:
+        return await self._acall(
+            lambda remaining: self.backend.agenerate_json(
+                prompt, response_schema, self._timeout(remaining, timeout)
+            )
+        )
@@ -0,0 +1,63 @@
+"""
+Structured-output response schemas derived from the Pydantic models.
+
+The Gemini API accepts an OpenAPI-style subset of JSON Schema: no $ref/$defs,
+no anyOf, no titles or defaults, and optional values marked "nullable". Each
+schema is generated once at import from models.py, so what the model is asked
+for always matches what validation will accept.
+"""
+
+from typing import Any, Dict, Type
+
+from pydantic import BaseModel
+
+from models import DailyPlan, PlanSkeleton, UserProfile, WeeklyDietPlan
+from profile_updates import ProfileUpdate
+
+# Keywords the Gemini schema dialect understands; everything else is dropped
+_SUPPORTED_KEYS = ("type", "format", "description", "nullable", "enum", "items", "properties", "required")
+
+
+def _resolve(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    """Inline $ref and fold Optional (anyOf with null) into nullable"""
+    if "$ref" in node:
+        target = defs[node["$ref"].rsplit("/", 1)[-1]]
+        # Keywords next to the $ref (the field description) win over the definition's
+        node = {**target, **{k: v for k, v in node.items() if k != "$ref"}}
+        return _resolve(node, defs)
+    if "anyOf" in node:
+        options = [option for option in node["anyOf"] if option.get("type") != "null"]
+        if len(options) != 1:
+            raise ValueError(f"Unsupported union in response schema: {node['anyOf']}")
+        merged = {**_resolve(options[0], defs), **{k: v for k, v in node.items() if k != "anyOf"}}
+        if len(options) < len(node["anyOf"]):
+            merged["nullable"] = True
+        return merged
+    return node
+
+
+def _simplify(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    node = _resolve(node, defs)
+    schema = {key: node[key] for key in _SUPPORTED_KEYS if key in node}
+    if "enum" in schema and schema.get("type") == "string":
+        schema["format"] = "enum"
+    if "items" in schema:
+        schema["items"] = _simplify(schema["items"], defs)
+    if "properties" in schema:
+        schema["properties"] = {
+            name: _simplify(prop, defs) for name, prop in schema["properties"].items()
+        }
+    return schema
+
+
+def gemini_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """model's JSON schema rewritten for the Gemini structured-output dialect"""
+    full = model.model_json_schema()
+    return _simplify(full, full.get("$defs", {}))
+
+
+USER_PROFILE_SCHEMA = gemini_schema(UserProfile)
+PROFILE_UPDATE_SCHEMA = gemini_schema(ProfileUpdate)
+WEEKLY_PLAN_SCHEMA = gemini_schema(WeeklyDietPlan)
+DAILY_PLAN_SCHEMA = gemini_schema(DailyPlan)
+PLAN_SKELETON_SCHEMA = gemini_schema(PlanSkeleton)
@@ -0,0 +1,80 @@
+"""
+Single-flight call coalescing.
+
+While a call for a key is in flight, further calls with the same key wait
+for it and share its result (or exception) instead of starting their own.
+Nothing is cached once the call completes; that is the plan cache's job.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class SingleFlight:
+    """Coalesces concurrent calls across threads"""
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn unless a call for key is already in flight; returns (result, shared)"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent coroutine calls on an event loop"""
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, str], asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(
+        self, key: str, make_coro: Callable[[], Awaitable[Any]], timeout: Optional[float] = None
+    ) -> Tuple[Any, bool]:
+        """Await make_coro() unless a call for key is already in flight; returns (result, shared).
+
+        timeout bounds only this caller's wait. The shared call must not depend on
+        any one caller's limits, since others may be waiting on it longer.
+        """
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+        task = self._calls.get(call_key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            task = loop.create_task(make_coro())
+            self._calls[call_key] = task
+            task.add_done_callback(lambda done: self._finish(call_key, done))
+        # Shielded: a caller timing out or being cancelled must not cancel the shared call
+        return await asyncio.wait_for(asyncio.shield(task), timeout), shared
+
+    def _finish(self, call_key: Tuple[int, str], task: asyncio.Task) -> None:
+        self._calls.pop(call_key, None)
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter has gone away
+            task.exception()
@@ -0,0 +1,25 @@
+import asyncio
+import json
+import random
+
+from ai_dietitian import AIDietitian
+from batch_generate import BatchRunner, read_profiles
+from llm_backends import FakeBackend, synthetic_user_profile
+
+
+def test_malformed_input_lines_are_recorded_as_failures(tmp_path):
+    source = tmp_path / "profiles.jsonl"
+    source.write_text(
+        synthetic_user_profile(random.Random(0)).model_dump_json() + "\n{broken\n[1, 2]\n",
+        encoding="utf-8",
+    )
+    output = tmp_path / "plans.jsonl"
+    runner = BatchRunner(AIDietitian(backend=FakeBackend(), use_plan_cache=False), str(output), workers=2)
+
+    report = asyncio.run(runner.run(read_profiles(str(source))))
+
+    assert (report["succeeded"], report["failed"]) == (1, 2)
+    records = {record["id"]: record for record in map(json.loads, output.read_text().splitlines())}
+    assert records["1"]["status"] == "ok"
+    assert records["2"]["status"] == "error" and "line 2" in records["2"]["error"]
+    assert records["3"]["status"] == "error" and "JSON object" in records["3"]["error"]
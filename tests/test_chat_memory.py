@@ -0,0 +1,78 @@
+import asyncio
+
+from ai_dietitian import AIDietitian
+from chat_memory import ChatMemory
+from llm_backends import FakeBackend
+
+
+class FailingSummaries(FakeBackend):
+    """Fake backend whose summary calls fail after the first `allowed`"""
+
+    def __init__(self, allowed):
+        super().__init__(seed=1)
+        self.allowed = allowed
+        self.last_messages = None
+
+    def generate_chat(self, messages, system_instruction=None):
+        if system_instruction != "chat":
+            if self.allowed <= 0:
+                raise RuntimeError("summary failed")
+            self.allowed -= 1
+            return "notes"
+        self.last_messages = messages
+        return "reply"
+
+    async def agenerate_chat(self, messages, system_instruction=None):
+        return self.generate_chat(messages, system_instruction)
+
+
+def _dietitian(allowed):
+    dietitian = AIDietitian(
+        backend=FailingSummaries(allowed),
+        chat_memory=ChatMemory(recent_messages=4, summary_chunk=4, token_budget=100000),
+        use_plan_cache=False,
+    )
+    dietitian.system_prompt = "chat"
+    return dietitian
+
+
+def _history(count):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}"}
+        for i in range(count)
+    ]
+
+
+def _sent_texts(dietitian):
+    return [m["parts"] for m in dietitian.backend.last_messages]
+
+
+def test_summarized_messages_are_not_sent_verbatim():
+    dietitian = _dietitian(allowed=10)
+    dietitian.chat("next", _history(16))
+    sent = _sent_texts(dietitian)
+    assert "message 11" not in sent and "message 12" in sent
+
+
+def test_failed_summary_sends_uncovered_messages_verbatim():
+    # Boundary is 12; only the first chunk (messages 0-3) gets summarized
+    dietitian = _dietitian(allowed=1)
+    dietitian.chat("next", _history(16))
+    sent = _sent_texts(dietitian)
+    assert "message 3" not in sent
+    assert all(f"message {i}" in sent for i in range(4, 16))
+
+
+def test_failed_summary_async():
+    dietitian = _dietitian(allowed=0)
+    asyncio.run(dietitian.achat("next", _history(16)))
+    sent = _sent_texts(dietitian)
+    assert all(f"message {i}" in sent for i in range(16))
+
+
+def test_uncovered_messages_are_trimmed_to_budget():
+    dietitian = _dietitian(allowed=0)
+    dietitian.chat_memory.token_budget = 80
+    dietitian.chat("next", _history(16))
+    sent = _sent_texts(dietitian)
+    assert "message 15" in sent and "message 0" not in sent
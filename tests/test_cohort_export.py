@@ -0,0 +1,27 @@
+import json
+
+from benchmarks import fixtures
+from cohort_export import read_plans
+
+
+def test_read_plans_accepts_records_and_bare_plans(tmp_path, capsys):
+    plan = fixtures.weekly_plan()
+    data = plan.model_dump(mode="json")
+    # A bare plan whose text mentions "status" still reads as a plan
+    noted = json.loads(json.dumps(data))
+    noted["recommendations"] = ['Track your "status" weekly']
+    lines = [
+        {"id": "1", "status": "ok", "latency_s": 1.0, "plan": data},
+        {"id": "2", "status": "error", "error": "timeout"},
+        data,
+        noted,
+    ]
+    path = tmp_path / "plans.jsonl"
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\nnot json\n", encoding="utf-8")
+
+    plans = list(read_plans(str(path)))
+
+    assert plans[:2] == [plan, plan]
+    assert plans[2].recommendations == ['Track your "status" weekly']
+    assert len(plans) == 3
+    assert "Skipping line 5" in capsys.readouterr().out
@@ -0,0 +1,56 @@
+import pytest
+
+from ingredients import ingredient_name, parse_ingredient
+from nutrition_db import FoodDatabase, get_food_database
+
+
+@pytest.mark.parametrize(
+    "ingredient",
+    [
+        "1 cup butter milk",
+        "1 cup rice milk",
+        "1 cup coconut water",
+        "1 cup coconut milk",
+        "1 cup almond milk",
+        "1 cup soy milk",
+        "1 cup oat milk",
+        "100 g egg noodles",
+        "1/2 cup rice flour",
+        "100 g chicken curry",
+        "2 chicken sausages",
+    ],
+)
+def test_compound_foods_do_not_match_a_word_inside(ingredient):
+    assert get_food_database().ingredient_grams(ingredient) is None
+
+
+@pytest.mark.parametrize(
+    "ingredient, food",
+    [
+        ("1 cup buttermilk", "buttermilk"),
+        ("2 eggs", "egg"),
+        ("2 medium onions, chopped", "onion"),
+        ("1 cup steamed rice", "cooked rice"),
+    ],
+)
+def test_exact_and_alias_matches(ingredient, food):
+    resolved = get_food_database().ingredient_grams(ingredient)
+    assert resolved is not None and resolved[0].name == food
+
+
+def test_unresolved_meal_keeps_model_figures():
+    assert get_food_database().meal_nutrition(["1 cup almond milk", "2 eggs"]) is None
+
+
+def test_one_parser_for_shopping_list_and_lookup():
+    assert parse_ingredient("1 1/2 cups of cooked rice, warm") == (1.5, "cups", "cooked rice")
+    assert ingredient_name("A pinch of salt") == "salt"
+    assert ingredient_name("2 medium onions, chopped") == "onions"
+
+
+def test_lookup_cache_is_bounded():
+    database = FoodDatabase(max_cached_names=3)
+    for name in ("rice", "unknown food 1", "unknown food 2", "rice", "unknown food 3"):
+        database.lookup(name)
+    assert list(database._lookup_cache) == ["unknown food 2", "rice", "unknown food 3"]
+    assert database.lookup("rice").name == get_food_database().lookup("rice").name
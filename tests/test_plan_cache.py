@@ -0,0 +1,111 @@
+import asyncio
+import random
+import time
+
+from ai_dietitian import AIDietitian
+from benchmarks import fixtures
+from config import Config
+from llm_backends import FakeBackend, synthetic_user_profile
+from plan_cache import PlanCache, normalize_profile
+
+
+def _dietitian(tmp_path):
+    return AIDietitian(backend=FakeBackend(), plan_cache=PlanCache(str(tmp_path / "plans.sqlite3")))
+
+
+def test_template_lookups_do_not_count_as_plan_cache_misses(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "PLAN_TEMPLATES_ENABLED", True)
+    dietitian = _dietitian(tmp_path)
+    profile = synthetic_user_profile(random.Random(1))
+
+    dietitian.create_diet_plan(profile)
+    stats = dietitian.plan_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 1)
+    assert (stats["template_hits"], stats["template_misses"]) == (0, 1)
+
+    # Same bucket, different person: an exact miss answered by the template
+    dietitian.create_diet_plan(profile.model_copy(update={"name": "Someone Else"}))
+    stats = dietitian.plan_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 2)
+    assert (stats["template_hits"], stats["template_misses"]) == (1, 1)
+
+    dietitian.create_diet_plan(profile)
+    assert dietitian.plan_cache.stats()["hits"] == 1
+
+
+def _last_access(cache, key):
+    return cache._conn.execute("SELECT last_access FROM plan_cache WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_hits_defer_access_time_writes_until_flushed(tmp_path):
+    plan = fixtures.weekly_plan()
+    cache = PlanCache(str(tmp_path / "plans.sqlite3"))
+    cache.put("a", plan)
+    stored = _last_access(cache, "a")
+
+    assert cache.get("a") is not None
+    assert _last_access(cache, "a") == stored
+    cache.flush()
+    assert _last_access(cache, "a") > stored
+
+
+def test_eviction_sees_deferred_access_times(tmp_path):
+    plan = fixtures.weekly_plan()
+    cache = PlanCache(str(tmp_path / "plans.sqlite3"), max_entries=2)
+    cache.put("a", plan)
+    cache.put("b", plan)
+    cache.get("a")  # "b" is now least recently used
+
+    cache.put("c", plan)
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+
+
+def test_normalize_profile_keeps_the_name_as_given():
+    profile = fixtures.user_profile().model_copy(update={"name": "Asha Rao", "cooking_skill": " Beginner "})
+    normalized = normalize_profile(profile)
+    assert normalized["name"] == "Asha Rao"
+    assert normalized["cooking_skill"] == "beginner"
+
+
+class SlowPlanCache(PlanCache):
+    """PlanCache whose reads and writes block for a while, like a busy disk"""
+
+    def get(self, key, template=False):
+        time.sleep(0.2)
+        return super().get(key, template)
+
+    def put(self, key, plan):
+        time.sleep(0.2)
+        super().put(key, plan)
+
+
+def test_async_plans_keep_cache_io_off_the_event_loop(tmp_path):
+    dietitian = AIDietitian(backend=FakeBackend(), plan_cache=SlowPlanCache(str(tmp_path / "plans.sqlite3")))
+    profile = synthetic_user_profile(random.Random(1))
+
+    async def longest_stall(work):
+        """Longest gap between ticks of a 10 ms ticker while work runs"""
+        gaps = []
+
+        async def tick():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticker = asyncio.ensure_future(tick())
+        await work
+        ticker.cancel()
+        return max(gaps)
+
+    async def run():
+        return (
+            await longest_stall(dietitian.acreate_diet_plan(profile)),
+            await longest_stall(dietitian.acreate_diet_plan_per_day(profile)),
+        )
+
+    for stall in asyncio.run(run()):
+        assert stall < 0.15
@@ -0,0 +1,222 @@
+import asyncio
+import random
+
+import pytest
+
+import resilience
+from llm_backends import LLMBackend
+from resilience import CircuitBreaker, CircuitOpenError, ResilientBackend, backoff_delay, is_transient
+
+
+class Clock:
+    """Stand-in for the time module as resilience uses it; advanced by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Replaces resilience's reference only; asyncio keeps the real clock
+    clock = Clock()
+    monkeypatch.setattr(resilience, "time", clock)
+    return clock
+
+
+class ScriptedBackend(LLMBackend):
+    """Raises or returns the scripted outcomes in order"""
+
+    model_name = "scripted"
+
+    def __init__(self, outcomes, delay=0.0, clock=None):
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        # With a clock, sync calls take delay seconds on it, cut short by their timeout
+        self.clock = clock
+        self.calls = 0
+        self.timeouts = []
+
+    def _next(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    def generate_json(self, prompt, response_schema, timeout=None):
+        self.timeouts.append(timeout)
+        if self.clock is not None:
+            if timeout is not None and self.delay > timeout:
+                self.clock.sleep(timeout)
+                self.calls += 1
+                raise TimeoutError()
+            self.clock.sleep(self.delay)
+        return self._next()
+
+    async def agenerate_json(self, prompt, response_schema, timeout=None):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self._next()
+
+
+def _backend(outcomes, breaker=None, delay=0.0, max_retries=0):
+    return ResilientBackend(
+        ScriptedBackend(outcomes, delay),
+        max_retries=max_retries,
+        backoff_base=0.0,
+        backoff_max=0.0,
+        deadline_seconds=60,
+        breaker=breaker,
+        rng=random.Random(0),
+    )
+
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    backend = _backend([ConnectionError(), ConnectionError(), "recovered"], breaker)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            backend.generate_json("p", None)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        backend.generate_json("p", None)
+    assert backend.backend.calls == 2
+
+    clock.now += 30
+    assert backend.generate_json("p", None) == "recovered"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    backend = _backend([ConnectionError(), ConnectionError()], breaker)
+    with pytest.raises(ConnectionError):
+        backend.generate_json("p", None)
+
+    clock.now += 30
+    with pytest.raises(ConnectionError):
+        backend.generate_json("p", None)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        backend.generate_json("p", None)
+
+
+def test_only_one_trial_while_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_cancelled_trial_releases_half_open_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+    backend = _backend([], breaker, delay=10)
+
+    async def cancelled_trial():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(backend.agenerate_json("p", None), timeout=0.01)
+
+    asyncio.run(cancelled_trial())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # The next call is let through as a new trial
+    breaker.before_call()
+
+
+def test_unreported_trial_expires(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30, trial_timeout_seconds=60)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 60
+    breaker.before_call()
+
+
+def test_timeouts_are_transient():
+    assert is_transient(asyncio.TimeoutError())
+    assert is_transient(TimeoutError())
+    assert not is_transient(ValueError())
+
+
+def test_attempt_timeout_is_retried(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=30)
+    backend = _backend([asyncio.TimeoutError(), "ok"], breaker, max_retries=2)
+    assert asyncio.run(backend.agenerate_json("p", None)) == "ok"
+    assert backend.retries == 1
+    assert breaker.failures == 0
+
+
+def test_non_transient_error_is_not_retried():
+    backend = _backend([ValueError("bad request")], max_retries=3)
+    with pytest.raises(ValueError):
+        backend.generate_json("p", None)
+    assert backend.backend.calls == 1
+
+
+def test_retries_stop_at_deadline(clock):
+    backend = ResilientBackend(
+        ScriptedBackend([ConnectionError()] * 10),
+        max_retries=10,
+        backoff_base=4.0,
+        backoff_max=4.0,
+        deadline_seconds=10,
+        breaker=CircuitBreaker(failure_threshold=100),
+        rng=random.Random(1),
+    )
+    with pytest.raises(ConnectionError):
+        backend.generate_json("p", None)
+    assert clock.now - 1000.0 < 10
+
+
+def test_sync_attempts_are_capped_at_the_time_left(clock):
+    # Each attempt runs 0.8s before failing; a second full attempt would overrun
+    backend = ResilientBackend(
+        ScriptedBackend([ConnectionError()] * 10, delay=0.8, clock=clock),
+        max_retries=10,
+        backoff_base=0.01,
+        backoff_max=0.01,
+        deadline_seconds=1.0,
+        breaker=CircuitBreaker(failure_threshold=100),
+        rng=random.Random(1),
+        min_attempt_seconds=0.05,
+    )
+    with pytest.raises((ConnectionError, TimeoutError)):
+        backend.generate_json("p", None)
+    assert clock.now - 1000.0 <= 1.0
+    assert backend.backend.timeouts[0] == pytest.approx(1.0)
+    assert all(timeout < 1.0 for timeout in backend.backend.timeouts[1:])
+
+
+def test_no_attempt_starts_below_the_floor(clock):
+    backend = ResilientBackend(
+        ScriptedBackend([ConnectionError()] * 10, delay=0.8, clock=clock),
+        max_retries=10,
+        backoff_base=0.01,
+        backoff_max=0.01,
+        deadline_seconds=1.0,
+        breaker=CircuitBreaker(failure_threshold=100),
+        rng=random.Random(1),
+        min_attempt_seconds=0.5,
+    )
+    with pytest.raises(ConnectionError):
+        backend.generate_json("p", None)
+    assert backend.backend.calls == 1
+
+
+def test_backoff_delay_is_capped():
+    rng = random.Random(0)
+    assert all(0.0 <= backoff_delay(attempt, 0.5, 8.0, rng) <= 8.0 for attempt in range(20))
+    assert backoff_delay(0, 0.5, 8.0, rng) <= 0.5
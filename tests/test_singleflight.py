@@ -0,0 +1,126 @@
+import asyncio
+import random
+import threading
+
+import pytest
+
+from ai_dietitian import AIDietitian
+from llm_backends import FakeBackend, synthetic_user_profile
+from singleflight import SingleFlight
+
+
+def _dietitian(latency_seconds):
+    return AIDietitian(backend=FakeBackend(latency_seconds=latency_seconds), use_plan_cache=False)
+
+
+def _profiles():
+    """Two profiles with the same canonical form but different list order"""
+    profile = synthetic_user_profile(random.Random(3))
+    reordered = profile.model_copy(update={"preferences": list(reversed(profile.preferences)) + ["rice"]})
+    return profile.model_copy(update={"preferences": profile.preferences + ["rice"]}), reordered
+
+
+def test_sync_callers_share_one_generation():
+    dietitian = _dietitian(0.2)
+    first, second = _profiles()
+    plans = {}
+
+    def create(name, profile):
+        plans[name] = dietitian.create_diet_plan(profile)
+
+    threads = [
+        threading.Thread(target=create, args=("first", first)),
+        threading.Thread(target=create, args=("second", second)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert dietitian.backend.calls == 1
+    assert dietitian._flights.coalesced == 1
+    # Each caller gets their own profile back
+    assert plans["first"].user_profile == first
+    assert plans["second"].user_profile == second
+
+
+def test_sync_failure_reaches_every_caller():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def fail():
+        started.set()
+        release.wait(1)
+        raise ValueError("upstream down")
+
+    def call():
+        try:
+            flights.do("key", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=call)
+    follower.start()
+    while flights.coalesced == 0:
+        pass
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2
+
+
+def test_follower_keeps_its_own_timeout():
+    dietitian = _dietitian(0.3)
+    profile, _ = _profiles()
+
+    async def run():
+        return await asyncio.gather(
+            dietitian.acreate_diet_plan(profile, timeout=0.1),
+            dietitian.acreate_diet_plan(profile, timeout=5),
+            return_exceptions=True,
+        )
+
+    impatient, patient = asyncio.run(run())
+
+    assert isinstance(impatient, asyncio.TimeoutError)
+    assert patient is not None and not isinstance(patient, BaseException)
+    assert dietitian.backend.calls == 1
+
+
+def test_leader_keeps_its_own_timeout():
+    dietitian = _dietitian(0.3)
+    profile, _ = _profiles()
+
+    async def run():
+        return await asyncio.gather(
+            dietitian.acreate_diet_plan(profile, timeout=5),
+            dietitian.acreate_diet_plan(profile, timeout=0.1),
+            return_exceptions=True,
+        )
+
+    patient, impatient = asyncio.run(run())
+
+    assert isinstance(impatient, asyncio.TimeoutError)
+    assert patient is not None and not isinstance(patient, BaseException)
+
+
+@pytest.mark.parametrize("attempts, coalesced", [((2, 2), 1), ((1, 3), 0)])
+def test_per_day_calls_coalesce_only_with_equal_attempts(attempts, coalesced):
+    dietitian = _dietitian(0.05)
+    profile, _ = _profiles()
+
+    async def run():
+        return await asyncio.gather(
+            *(dietitian.acreate_diet_plan_per_day(profile, max_day_attempts=n) for n in attempts)
+        )
+
+    plans = asyncio.run(run())
+
+    assert all(plan is not None for plan in plans)
+    assert dietitian._aflights.coalesced == coalesced